@@ -2,6 +2,7 @@
 import os
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import Any, Dict
 from mcp.server.fastmcp import FastMCP
 import dotenv
@@ -16,8 +17,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Use uvloop for the server's event loop when it is installed (not available on Windows)
+try:
+    import uvloop
+    # uvloop.install() is deprecated on Python 3.12+; set the policy directly
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.debug("Using uvloop event loop")
+except ImportError:
+    pass
+
+# Optionally warm every active course's assignment listing once at startup (for
+# search and exam lookups), a few courses at a time so the first user request
+# still gets most of the request budget. Off by default: it costs a request per
+# course, and most sessions never read those listings.
+PREFETCH_ASSIGNMENTS = os.environ.get("CANVAS_PREFETCH_ASSIGNMENTS", "0").lower() in ("1", "true", "yes")
+PREFETCH_CONCURRENCY = 4
+
+async def _warm_assignments():
+    """Fill the get_course_assignments cache for the active courses."""
+    from tools.utils import fetch_all_courses
+    courses = await get_courses()
+    if isinstance(courses, dict) and "error" in courses:
+        logger.warning(f"Assignment prefetch skipped: {courses['error']}")
+        return
+    # get_course_assignments is cached by course ID, so pass IDs, not the course dicts
+    await fetch_all_courses(
+        get_course_assignments, [course["id"] for course in courses], concurrency=PREFETCH_CONCURRENCY
+    )
+    logger.debug("Prefetched assignments for %s courses", len(courses))
+
+async def _warm_courses():
+    """Prefetch the active course list once, at startup.
+    
+    Later refreshes are left to the caches: the response and result caches
+    persist on disk, and stale entries are refreshed in the background when a
+    tool asks for them, so an idle server makes no requests.
+    """
+    from tools.canvas_client import prefetch_courses
+    try:
+        await asyncio.to_thread(prefetch_courses)
+        # The course list is now a cache hit, so this only adds the
+        # per-course assignment requests
+        if PREFETCH_ASSIGNMENTS:
+            await _warm_assignments()
+    except Exception as e:
+        logger.warning(f"Course prefetch failed: {e}")
+
+@asynccontextmanager
+async def lifespan(server):
+    """Prefetch courses in the background when the server starts."""
+    prefetch = asyncio.create_task(_warm_courses())
+    try:
+        yield
+    finally:
+        prefetch.cancel()
+
 # Initializing FastMCP server
-mcp = FastMCP("canvas-student")
+mcp = FastMCP("canvas-student", lifespan=lifespan)
 
 # Load environment variables
 # Consider using python-dotenv for better env management
@@ -27,10 +83,6 @@ CLIENT_ID = os.environ.get("CANVAS_CLIENT_ID")
 CLIENT_SECRET = os.environ.get("CANVAS_CLIENT_SECRET")
 REDIRECT_URI = os.environ.get("REDIRECT_URI", "http://localhost:8000/oauth/callback")
 
-# Rename this file to canvas_student.py (underscore instead of hyphen) for importability
-# Change filename in imports for other modules
-# For now we'll continue with the current name
-
 # Import tools - these imports need to match our file structure
 from tools.courses import get_courses, get_course_details
 from tools.assignments import get_course_assignments, find_exams_in_course, get_upcoming_deadlines
@@ -38,45 +90,31 @@ from tools.content import get_course_files, get_course_modules, get_course_pages
 from tools.search import search_course, search_all_courses
 from tools.utils import format_course_summary, clear_cache
 from tools.canvas_client import check_auth
-from tools.file_content import get_file_content
+from tools.file_content import get_file_content, get_file_contents
 from tools.todos import get_todo_items, get_upcoming_todo_items
 from tools.quizzes import get_course_quizzes, get_all_quizzes, get_quiz_details
 
-# Register course tools
-mcp.tool()(get_courses)
-mcp.tool()(get_course_details)
-
-# Register assignment tools
-mcp.tool()(get_course_assignments)
-mcp.tool()(find_exams_in_course)
-mcp.tool()(get_upcoming_deadlines)
-
-# Register content tools
-mcp.tool()(get_course_files)
-mcp.tool()(get_course_modules)
-mcp.tool()(get_course_pages)
-mcp.tool()(get_course_announcements)
-
-# Register search tools
-mcp.tool()(search_course)
-mcp.tool()(search_all_courses)
-
-# Register utility tools
-mcp.tool()(format_course_summary)
-mcp.tool()(clear_cache)
-
-# Register file content tool
-mcp.tool()(get_file_content)
-
-# Register todo and quiz tools
-mcp.tool()(get_todo_items)
-mcp.tool()(get_upcoming_todo_items)
-mcp.tool()(get_course_quizzes)
-mcp.tool()(get_all_quizzes)
-mcp.tool()(get_quiz_details)
-
-# Authentication tools
-mcp.tool()(check_auth)  # Using check_auth from canvas_client
+# Register all tools in one pass
+for tool in (
+    # Course tools
+    get_courses, get_course_details,
+    # Assignment tools
+    get_course_assignments, find_exams_in_course, get_upcoming_deadlines,
+    # Content tools
+    get_course_files, get_course_modules, get_course_pages, get_course_announcements,
+    # Search tools
+    search_course, search_all_courses,
+    # Utility tools
+    format_course_summary, clear_cache,
+    # File content tools
+    get_file_content, get_file_contents,
+    # Todo and quiz tools
+    get_todo_items, get_upcoming_todo_items,
+    get_course_quizzes, get_all_quizzes, get_quiz_details,
+    # Authentication tools
+    check_auth,  # Using check_auth from canvas_client
+):
+    mcp.tool()(tool)
 
 @mcp.tool()
 async def get_auth_url(redirect_uri: str = REDIRECT_URI) -> Dict[str, Any]:
@@ -9,6 +9,7 @@ This script simplifies the installation process by:
 """
 import os
 import sys
+import shutil
 import subprocess
 import platform
 
@@ -24,12 +25,10 @@ def main():
         return 1
     
     # Detect if uv is available
-    try:
-        subprocess.run(["uv", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        use_uv = True
+    use_uv = shutil.which("uv") is not None
+    if use_uv:
         print("✅ UV package manager detected")
-    except (subprocess.SubprocessError, FileNotFoundError):
-        use_uv = False
+    else:
         print("ℹ️ UV not found, using pip instead")
     
     # Install the package with PDF support
@@ -1,6 +1,9 @@
 """Assignment-related tools for Canvas MCP."""
-from datetime import datetime, timedelta
+import asyncio
+import heapq
+from datetime import datetime, timedelta, timezone
 import logging
+import re
 from typing import List, Dict, Any, Union, Optional
 from canvasapi.exceptions import CanvasException
 
@@ -8,17 +11,88 @@ from canvasapi.exceptions import CanvasException
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from tools.utils import cached, format_for_claude
-from tools.canvas_client import get_canvas, get_object_data
+from tools.utils import cached, fetch_all_courses, format_for_claude, single_flight
+from tools.canvas_client import get_canvas, get_course_ref, get_object_data, fetch_all_pages
+
+# Keywords that mark an assignment as a likely exam, matched case-insensitively
+# anywhere in the name or description in a single scan
+EXAM_KEYWORDS_PATTERN = re.compile(r"exam|test|quiz|midterm|final|assessment", re.IGNORECASE)
+
+def _due_at_key(deadline: Dict[str, Any]) -> str:
+    """Sort key for deadline dicts (REST due_at strings sort chronologically)."""
+    return deadline.get('due_at', '')
+
+def _format_deadline(deadline: Dict[str, Any]) -> str:
+    """Format one deadline as a single line for Claude."""
+    return (f"{deadline.get('name', 'Unnamed assignment')} - Due: {deadline.get('due_at', 'No due date')}"
+            f" - Points: {deadline.get('points_possible', 'N/A')}")
+
+# Assignments fetched per course by the GraphQL deadlines query
+GRAPHQL_PAGE_SIZE = 100
+
+# Fields kept for each deadline, whether its course was fetched with GraphQL
+# or through the REST fallback, so every deadline has the same shape
+DEADLINE_FIELDS = ('id', 'name', 'due_at', 'points_possible', 'html_url')
+
+def _to_rest_time(value: Optional[str]) -> Optional[str]:
+    """Convert a GraphQL ISO 8601 timestamp to the REST API's UTC format."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _fetch_assignments_graphql(canvas, course_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Fetch assignments for many courses with a single GraphQL request.
+    
+    Args:
+        canvas: The Canvas client
+        course_ids: IDs of the courses to fetch
+        
+    Returns:
+        Assignment dicts (REST field names) keyed by course ID. Courses the
+        query couldn't fully cover (errors, more than one page) are left out.
+    """
+    fields = " ".join(
+        f'c{course_id}: course(id: "{course_id}") {{ '
+        f'assignmentsConnection(first: {GRAPHQL_PAGE_SIZE}) {{ '
+        f'nodes {{ _id name dueAt pointsPossible htmlUrl }} pageInfo {{ hasNextPage }} }} }}'
+        for course_id in course_ids
+    )
+    response = canvas.graphql(f"query {{ {fields} }}")
+    if response.get("errors"):
+        logger.warning(f"GraphQL assignment query returned errors: {response['errors']}")
+    data = response.get("data") or {}
+    
+    assignments_by_course = {}
+    for course_id in course_ids:
+        connection = (data.get(f"c{course_id}") or {}).get("assignmentsConnection")
+        if not connection or connection["pageInfo"]["hasNextPage"]:
+            continue
+        assignments_by_course[course_id] = [
+            {
+                'id': int(node['_id']),
+                'name': node['name'],
+                'due_at': _to_rest_time(node['dueAt']),
+                'points_possible': node['pointsPossible'],
+                'html_url': node['htmlUrl'],
+            }
+            for node in connection["nodes"]
+        ]
+    return assignments_by_course
 
 @cached()
 async def get_course_assignments(course_id: int) -> List[Dict[str, Any]]:
     """Get all assignments for a specific course."""
-    try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        assignments = list(course.get_assignments())
+    def fetch():
+        course = get_course_ref(course_id)
+        assignments = fetch_all_pages(course.get_assignments())
         return [get_object_data(assignment) for assignment in assignments]
+    
+    try:
+        # canvasapi is blocking; run it off the event loop so callers can fan out
+        return await asyncio.to_thread(fetch)
     except CanvasException as e:
         logger.error(f"Error getting assignments for course {course_id}: {e}")
         return {"error": str(e), "status": "error"}
@@ -26,6 +100,7 @@ async def get_course_assignments(course_id: int) -> List[Dict[str, Any]]:
         logger.error(f"Unexpected error retrieving assignments: {e}")
         return {"error": str(e), "status": "unknown_error"}
 
+@single_flight
 async def find_exams_in_course(course_id: int) -> List[Dict[str, Any]]:
     """Find assignments that are likely exams in a course."""
     try:
@@ -35,26 +110,16 @@ async def find_exams_in_course(course_id: int) -> List[Dict[str, Any]]:
         if isinstance(assignments, dict) and "error" in assignments:
             return assignments
             
-        exam_keywords = ["exam", "test", "quiz", "midterm", "final", "assessment"]
         exams = []
         
+        # get_course_assignments always returns plain dicts
         for assignment in assignments:
-            # Check if any exam keywords are in the name or description
-            is_exam = False
-            
-            # Safely get name and description accounting for both dict and object
-            if isinstance(assignment, dict):
-                name = assignment.get("name", "").lower()
-                description = assignment.get("description", "") or ""
-            else:
-                name = getattr(assignment, "name", "").lower()
-                description = getattr(assignment, "description", "") or ""
-                
-            description = description.lower()
-            
-            if any(keyword in name for keyword in exam_keywords) or any(keyword in description for keyword in exam_keywords):
-                if not isinstance(assignment, dict):
-                    assignment = get_object_data(assignment)
+            # Check the name first; the (often long HTML) description is only
+            # scanned when the name doesn't match
+            if EXAM_KEYWORDS_PATTERN.search(assignment.get("name") or "") or (
+                (description := assignment.get("description"))
+                and EXAM_KEYWORDS_PATTERN.search(description)
+            ):
                 exams.append(assignment)
                 
         return exams
@@ -74,11 +139,11 @@ async def get_upcoming_deadlines(days: int = 7, include_past_due: bool = True) -
     Returns:
         dict: List of upcoming deadlines grouped by course
     """
-    logger.info(f"Getting upcoming deadlines for next {days} days (include_past_due={include_past_due})")
+    logger.info("Getting upcoming deadlines for next %s days (include_past_due=%s)", days, include_past_due)
     
     try:
         canvas = get_canvas()
-        courses = list(canvas.get_courses(enrollment_state='active'))
+        courses = fetch_all_pages(canvas.get_courses(enrollment_state='active'))
         
         now = datetime.now()
         cutoff_date = now + timedelta(days=days)
@@ -86,68 +151,84 @@ async def get_upcoming_deadlines(days: int = 7, include_past_due: bool = True) -
         # For past due items, look back up to 30 days
         past_due_cutoff = now - timedelta(days=30) if include_past_due else now
         
-        upcoming_deadlines = []
+        # Compare due dates as epoch seconds (due dates are UTC, now is local time)
+        past_due_ts = past_due_cutoff.timestamp()
+        cutoff_ts = cutoff_date.timestamp()
+        
+        deadlines_by_course = {}
         course_map = {}
         
+        # Fetch all courses' assignments in one GraphQL round trip
+        assignments_by_course = {}
+        if courses:
+            try:
+                assignments_by_course = await asyncio.to_thread(
+                    _fetch_assignments_graphql, canvas, [course.id for course in courses]
+                )
+            except Exception as e:
+                logger.warning(f"GraphQL assignment query failed, falling back to REST: {e}")
+        
+        # Fetch the courses GraphQL didn't cover concurrently, through the cached
+        # get_course_assignments so other tools (find_exams_in_course) reuse them
+        remaining = [course.id for course in courses if course.id not in assignments_by_course]
+        assignments_by_course.update(await fetch_all_courses(get_course_assignments, remaining))
+        
         for course in courses:
             course_map[course.id] = {
                 'id': course.id,
                 'name': course.name
             }
+            assignments = assignments_by_course[course.id]
+            if isinstance(assignments, Exception) or (isinstance(assignments, dict) and "error" in assignments):
+                logger.warning(f"Error getting assignments for course {course.id}: {assignments}")
+                continue
+            course_deadlines = []
             try:
-                assignments = course.get_assignments()
                 for assignment in assignments:
+                    due_at = assignment.get('due_at')
+                    
                     # Skip assignments without due dates
-                    if not assignment.due_at:
+                    if not due_at:
                         continue
                     
-                    # Parse the due date
-                    due_date = datetime.strptime(assignment.due_at, '%Y-%m-%dT%H:%M:%SZ')
+                    # Parse the due date (fromisoformat is C-accelerated and accepts "Z")
+                    due_ts = datetime.fromisoformat(due_at).timestamp()
                     
                     # Include if it's in our time window
-                    if past_due_cutoff <= due_date <= cutoff_date:
-                        deadline_info = get_object_data(assignment)
+                    if past_due_ts <= due_ts <= cutoff_ts:
+                        deadline_info = {field: assignment.get(field) for field in DEADLINE_FIELDS}
                         deadline_info['course_id'] = course.id
                         deadline_info['course_name'] = course.name
-                        upcoming_deadlines.append(deadline_info)
+                        course_deadlines.append(deadline_info)
             except Exception as course_error:
                 logger.warning(f"Error getting assignments for course {course.id}: {course_error}")
-        
-        # Sort by due date
-        upcoming_deadlines.sort(key=lambda x: x.get('due_at', ''))
-        
-        # Group by course
-        deadlines_by_course = {}
-        for deadline in upcoming_deadlines:
-            course_id = deadline['course_id']
-            if course_id not in deadlines_by_course:
-                deadlines_by_course[course_id] = {
-                    'course_name': deadline['course_name'],
-                    'deadlines': []
+            
+            # Group by course as we go, sorting each course's deadlines by due date
+            if course_deadlines:
+                course_deadlines.sort(key=_due_at_key)
+                deadlines_by_course[course.id] = {
+                    'course_name': course.name,
+                    'deadlines': course_deadlines
                 }
-            deadlines_by_course[course_id]['deadlines'].append(deadline)
         
-        # Format for Claude
-        formatted_courses = []
-        for course_id, course_data in deadlines_by_course.items():
-            course_name = course_data['course_name']
-            course_deadlines = course_data['deadlines']
-            
-            # Format each deadline within this course
-            formatted_deadlines = []
-            for deadline in course_deadlines:
-                due_at = deadline.get('due_at', 'No due date')
-                name = deadline.get('name', 'Unnamed assignment')
-                points = deadline.get('points_possible', 'N/A')
-                
-                formatted_deadline = f"{name} - Due: {due_at} - Points: {points}"
-                formatted_deadlines.append(formatted_deadline)
-            
-            # Add to the list of formatted courses
-            formatted_courses.append({
-                'name': course_name,
-                'deadlines': formatted_deadlines
-            })
+        # List courses by their earliest deadline, and merge the sorted
+        # per-course lists into one list sorted by due date
+        deadlines_by_course = dict(
+            sorted(deadlines_by_course.items(), key=lambda item: _due_at_key(item[1]['deadlines'][0]))
+        )
+        upcoming_deadlines = list(heapq.merge(
+            *(course_data['deadlines'] for course_data in deadlines_by_course.values()),
+            key=_due_at_key
+        ))
+        
+        # Format for Claude, one line per deadline within each course
+        formatted_courses = [
+            {
+                'name': course_data['course_name'],
+                'deadlines': [_format_deadline(deadline) for deadline in course_data['deadlines']]
+            }
+            for course_data in deadlines_by_course.values()
+        ]
         
         # Create the final Claude-friendly output
         formatted_output = format_for_claude(
@@ -1,32 +1,601 @@
 """Canvas API client using canvasapi."""
+import atexit
+import copy
+import hashlib
+import json
 import logging
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from canvasapi import Canvas
+from canvasapi.course import Course
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
 from canvasapi.exceptions import CanvasException
 
+try:
+    import orjson
+except ImportError:  # optional speedup, install with the "speedups" extra
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Get credentials from environment (fixing variable names and default values)
 CANVAS_API_TOKEN = os.environ.get("CANVAS_API_TOKEN", "12523~84nXE3aWP9ZQDr8Zawttf2KWFzCvevmaRB3khzML6JBUYnBAJh6BVFt6AneKWVwX")
 CANVAS_BASE_URL = os.environ.get("CANVAS_BASE_URL", "https://chalmers.instructure.com")
 
-# Global canvas instance
+# Connection pool settings for the shared HTTP session. The pool needs one
+# connection per concurrent request, so size it to the per-course fan-out.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = int(os.environ.get("CANVAS_MAX_CONNECTIONS", "32"))
+
+# canvasapi sends requests without a timeout, so a stalled connection would
+# hang the tool call forever. Seconds, applied to connect and each read.
+REQUEST_TIMEOUT = float(os.environ.get("CANVAS_TIMEOUT", "30"))
+
+# Request pacing: cap in-flight requests and the overall request rate so
+# per-course fan-out doesn't trip Canvas's throttling. The concurrency cap
+# starts at MAX_CONCURRENT_REQUESTS and adapts between MIN_CONCURRENT_REQUESTS
+# and the pool size (so every request gets a pooled connection). Throttling
+# halves it at once; latency only does once a full window of LATENCY_WINDOW
+# responses averages above TARGET_LATENCY seconds. Large Canvas listings
+# routinely take a second or more, so the default target is generous.
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("CANVAS_MAX_CONCURRENCY", "16"))
+MIN_CONCURRENT_REQUESTS = 2
+TARGET_LATENCY = float(os.environ.get("CANVAS_TARGET_LATENCY", "3.0"))
+LATENCY_WINDOW = 32
+MAX_REQUESTS_PER_SECOND = float(os.environ.get("CANVAS_MAX_RPS", "20"))
+
+class _RateLimiter:
+    """Enforce a minimum interval between consecutive requests."""
+
+    def __init__(self, rps: float):
+        self.min_interval = 1.0 / rps if rps > 0 else 0.0
+        self.last_ts = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request slot is available."""
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self.last_ts + self.min_interval - now
+            if wait > 0:
+                time.sleep(wait)
+                now += wait
+            self.last_ts = now
+
+# Retry policy for throttled or transiently failing requests
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 16.0
+RETRY_JITTER = 0.5
+RETRY_STATUS_CODES = frozenset((429, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# Canvas reports the remaining throttle budget on every response; slow down
+# before it runs out instead of waiting for a 403
+RATE_LIMIT_LOW_WATERMARK = 100.0
+RATE_LIMIT_PAUSE = 0.5
+
+# Short-lived cache of successful API GET responses, keyed by full URL.
+# TTLs are picked by the first matching path pattern. Expired responses stay
+# in memory so they can be revalidated with a conditional request.
+RESPONSE_CACHE_TTL = 60
+COURSES_CACHE_TTL = 300
+RESPONSE_CACHE_TTLS = (
+    (re.compile(r"/courses/?$"), COURSES_CACHE_TTL),
+    (re.compile(r"/assignments(/|$)"), 30),
+)
+_response_cache: Dict[str, Tuple[float, object]] = {}
+_response_cache_lock = threading.Lock()
+
+# The response cache is also written to disk so it survives server restarts
+# (Claude starts a fresh stdio server for every session). One database per
+# token, so cached data never leaks between accounts.
+DISK_CACHE_ENABLED = os.environ.get("CANVAS_DISK_CACHE", "1").lower() not in ("0", "false", "no")
+DISK_CACHE_DIR = os.path.expanduser(os.environ.get("CANVAS_CACHE_DIR", "~/.cache/canvas-student"))
+_disk_cache = None
+_disk_cache_lock = threading.Lock()
+
+# Worker threads used to fetch the remaining pages of a listing at once
+PAGE_FETCH_WORKERS = 8
+
+# Futures for API GETs currently on the wire, so duplicates can share them
+_inflight: Dict[str, Future] = {}
+
+class _AdaptiveLimiter:
+    """Concurrency limit tuned by additive-increase/multiplicative-decrease.
+
+    Each response raises the limit by half a permit, unless it was throttled
+    or completes a full window whose mean latency is above target; those halve
+    it instead.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, target: float, window: int):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.target = target
+        self._latencies = deque(maxlen=window)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self._in_flight >= int(self.limit):
+                self._cond.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def record(self, latency: float, overloaded: bool = False):
+        """Feed one observed request latency back into the limit."""
+        with self._cond:
+            self._latencies.append(latency)
+            slow = (len(self._latencies) == self._latencies.maxlen
+                    and sum(self._latencies) / len(self._latencies) > self.target)
+            if overloaded or slow:
+                self.limit = max(self.minimum, self.limit * 0.5)
+                # Start a fresh window so one slow burst only halves the limit once
+                self._latencies.clear()
+            else:
+                previous = int(self.limit)
+                self.limit = min(self.maximum, self.limit + 0.5)
+                if int(self.limit) > previous:
+                    self._cond.notify()
+
+_concurrency = _AdaptiveLimiter(
+    MAX_CONCURRENT_REQUESTS, MIN_CONCURRENT_REQUESTS, POOL_MAXSIZE, TARGET_LATENCY, LATENCY_WINDOW
+)
+_limiter = _RateLimiter(MAX_REQUESTS_PER_SECOND)
+
+# Global canvas instance. Tools call get_canvas from worker threads, so the
+# first calls are serialized to build exactly one client and session.
 _canvas = None
+_canvas_lock = threading.Lock()
 
 def get_canvas():
     """Get or create the Canvas client instance."""
     global _canvas
     if _canvas is None:
-        logger.info(f"Initializing Canvas client for {CANVAS_BASE_URL}")
-        _canvas = Canvas(CANVAS_BASE_URL, CANVAS_API_TOKEN)
+        with _canvas_lock:
+            if _canvas is None:
+                logger.info("Initializing Canvas client for %s", CANVAS_BASE_URL)
+                canvas = Canvas(CANVAS_BASE_URL, CANVAS_API_TOKEN)
+                _configure_session(canvas._Canvas__requester._session)
+                # Publish only once the session is configured
+                _canvas = canvas
     return _canvas
 
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given retry attempt."""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) + random.uniform(0, RETRY_JITTER)
+
+def _retry_after(response):
+    """Read the Retry-After header (in seconds) if Canvas sent one."""
+    try:
+        return min(RETRY_MAX_DELAY, float(response.headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _should_retry(response, stream: bool) -> bool:
+    """Check whether a response is a throttle or transient server error."""
+    if response.status_code in RETRY_STATUS_CODES:
+        return True
+    # Canvas signals throttling with a 403 and a plain-text body
+    if response.status_code == 403 and not stream:
+        return "Rate Limit Exceeded" in response.text
+    return False
+
+def _budget_low(response) -> bool:
+    """Check whether Canvas's rate-limit budget is nearly used up."""
+    try:
+        return float(response.headers["X-Rate-Limit-Remaining"]) < RATE_LIMIT_LOW_WATERMARK
+    except (KeyError, TypeError, ValueError):
+        return False
+
+def _pause_if_budget_low(response):
+    """Back off briefly when Canvas's rate-limit budget is nearly used up."""
+    if _budget_low(response):
+        logger.info(
+            "Canvas rate-limit budget low (%s), pausing %ss",
+            response.headers["X-Rate-Limit-Remaining"], RATE_LIMIT_PAUSE
+        )
+        time.sleep(RATE_LIMIT_PAUSE)
+
+def _response_cache_ttl(url: str) -> int:
+    """Get the response cache TTL for an API URL."""
+    path = urlsplit(url).path
+    for pattern, ttl in RESPONSE_CACHE_TTLS:
+        if pattern.search(path):
+            return ttl
+    return RESPONSE_CACHE_TTL
+
+def _is_cacheable(request, stream: bool) -> bool:
+    """Only buffered GETs against the REST API are cached (not file downloads)."""
+    return request.method == "GET" and not stream and "/api/v1/" in request.url
+
+class _CanvasResponse(Response):
+    """Response that decodes JSON bodies with orjson when it is installed."""
+
+    def json(self, **kwargs):
+        if orjson is None or kwargs or not self.content:
+            return super().json(**kwargs)
+        return orjson.loads(self.content)
+
+def _copy_response(response, request):
+    """Shallow-copy a fully read response so it can be handed to another caller."""
+    response = copy.copy(response)
+    response.request = request
+    return response
+
+def _get_disk_cache():
+    """Open the on-disk cache database, or return None if it is disabled or unusable."""
+    global _disk_cache, DISK_CACHE_ENABLED
+    if _disk_cache is None and DISK_CACHE_ENABLED:
+        token_id = hashlib.sha256(f"{CANVAS_BASE_URL}|{CANVAS_API_TOKEN}".encode()).hexdigest()[:16]
+        path = os.path.join(DISK_CACHE_DIR, f"cache-{token_id}.sqlite3")
+        try:
+            # Cached bodies are authenticated API data (grades, submissions,
+            # page content), so keep the directory and database owner-only
+            os.makedirs(DISK_CACHE_DIR, mode=0o700, exist_ok=True)
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+            # Databases written by earlier versions were created with the
+            # umask; tighten them too, since tools.utils unpickles results
+            # read back from this file
+            os.chmod(DISK_CACHE_DIR, 0o700)
+            os.chmod(path, 0o600)
+            db = sqlite3.connect(path, check_same_thread=False)
+            # HTTP responses (this module) and tool results (tools.utils.cached)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, expires REAL, status INTEGER, reason TEXT, headers TEXT, body BLOB)"
+            )
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires REAL, value BLOB)")
+            db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+            db.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+            db.commit()
+            _disk_cache = db
+            logger.info("Using disk cache at %s", path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Disk cache unavailable, using memory only: {e}")
+            DISK_CACHE_ENABLED = False
+    return _disk_cache
+
+@contextmanager
+def disk_cache():
+    """Hold the shared on-disk cache database for a few statements.
+
+    Yields:
+        The sqlite3 connection, or None if the disk cache is disabled
+    """
+    db = _get_disk_cache()
+    if db is None:
+        yield None
+        return
+    with _disk_cache_lock:
+        yield db
+
+def _load_from_disk(request):
+    """Rebuild a fresh response for this request from the disk cache, if any.
+
+    Returns:
+        A (monotonic expiry, response) tuple, or None on a miss
+    """
+    db = _get_disk_cache()
+    if db is None:
+        return None
+    try:
+        with _disk_cache_lock:
+            row = db.execute(
+                "SELECT expires, status, reason, headers, body FROM responses WHERE url = ?", (request.url,)
+            ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Error reading disk response cache: {e}")
+        return None
+    if row is None:
+        return None
+    expires, status, reason, headers, body = row
+    remaining = expires - time.time()
+    if remaining <= 0:
+        return None
+
+    response = _CanvasResponse()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(json.loads(headers))
+    response.encoding = "utf-8"
+    response.url = request.url
+    response._content = body
+    response.request = request
+    return time.monotonic() + remaining, response
+
+def _store_on_disk(url: str, ttl: int, response):
+    """Write a cached response through to the disk cache."""
+    db = _get_disk_cache()
+    if db is None:
+        return
+    try:
+        with _disk_cache_lock:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, time.time() + ttl, response.status_code, response.reason,
+                 json.dumps(dict(response.headers)), response.content),
+            )
+            db.commit()
+    except sqlite3.Error as e:
+        logger.warning(f"Error writing disk response cache: {e}")
+
+def _cached_response(request):
+    """Return a copy of a fresh cached response for this request, if any."""
+    with _response_cache_lock:
+        entry = _response_cache.get(request.url)
+    if entry is None or time.monotonic() >= entry[0]:
+        # Fall back to the disk cache and promote hits into memory
+        entry = _load_from_disk(request)
+        if entry is None:
+            return None
+        with _response_cache_lock:
+            _response_cache[request.url] = entry
+    return _copy_response(entry[1], request)
+
+def _stale_response(request):
+    """Return the expired cached response for this request, if one is still in memory."""
+    with _response_cache_lock:
+        entry = _response_cache.get(request.url)
+    return None if entry is None else entry[1]
+
+def _conditional_headers(response) -> Dict[str, str]:
+    """Turn a cached response's validators into conditional request headers."""
+    headers = {}
+    if "ETag" in response.headers:
+        headers["If-None-Match"] = response.headers["ETag"]
+    if "Last-Modified" in response.headers:
+        headers["If-Modified-Since"] = response.headers["Last-Modified"]
+    return headers
+
+def clear_response_cache():
+    """Drop all cached API responses, in memory and on disk."""
+    with _response_cache_lock:
+        _response_cache.clear()
+    db = _get_disk_cache()
+    if db is not None:
+        try:
+            with _disk_cache_lock:
+                db.execute("DELETE FROM responses")
+                db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error clearing disk response cache: {e}")
+
+class _CanvasAdapter(HTTPAdapter):
+    """Transport adapter used for every request made through the Canvas session."""
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        # Same layout as Response, only json() differs
+        response.__class__ = _CanvasResponse
+        return response
+
+    def send(self, request, **kwargs):
+        if not _is_cacheable(request, kwargs.get("stream", False)):
+            return self._send_with_retries(request, **kwargs)
+
+        response = _cached_response(request)
+        if response is not None:
+            logger.debug("Response cache hit for %s", request.url)
+            return response
+
+        # Coalesce concurrent identical GETs onto a single upstream request
+        with _response_cache_lock:
+            pending = _inflight.get(request.url)
+            if pending is None:
+                future = _inflight[request.url] = Future()
+        if pending is not None:
+            logger.debug("Joining in-flight request for %s", request.url)
+            return _copy_response(pending.result(), request)
+
+        try:
+            # Revalidate an expired response instead of downloading it again
+            stale = _stale_response(request)
+            validators = _conditional_headers(stale) if stale is not None else {}
+            if validators:
+                conditional = request.copy()
+                conditional.headers.update(validators)
+                response = self._send_with_retries(conditional, **kwargs)
+                if response.status_code == 304:
+                    logger.debug("Response for %s not modified, reusing cached body", request.url)
+                    response.close()
+                    response = _copy_response(stale, request)
+            else:
+                response = self._send_with_retries(request, **kwargs)
+            # Read the body now so the response can be shared and cached
+            response.content
+            if response.status_code == 200:
+                ttl = _response_cache_ttl(request.url)
+                with _response_cache_lock:
+                    _response_cache[request.url] = (time.monotonic() + ttl, response)
+                _store_on_disk(request.url, ttl, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _response_cache_lock:
+                _inflight.pop(request.url, None)
+
+    def _send_with_retries(self, request, **kwargs):
+        stream = kwargs.get("stream", False)
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = REQUEST_TIMEOUT
+        for attempt in range(MAX_RETRIES + 1):
+            _limiter.acquire()
+            try:
+                with _concurrency:
+                    started = time.monotonic()
+                    response = super().send(request, **kwargs)
+            except (RequestsConnectionError, Timeout) as e:
+                _concurrency.record(time.monotonic() - started, overloaded=True)
+                if attempt == MAX_RETRIES or request.method not in IDEMPOTENT_METHODS:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning(f"Request to {request.url} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            retry = _should_retry(response, stream)
+            # A nearly spent throttle budget counts as overload too, so the
+            # limit shrinks before Canvas starts rejecting requests
+            _concurrency.record(time.monotonic() - started, overloaded=retry or _budget_low(response))
+            if attempt < MAX_RETRIES and retry:
+                delay = _retry_after(response) or _backoff_delay(attempt)
+                logger.warning(f"Canvas returned {response.status_code} for {request.url}, retrying in {delay:.1f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+            break
+
+        _pause_if_budget_low(response)
+        if logger.isEnabledFor(logging.DEBUG):
+            # urllib3 reports the negotiated protocol as 10/11 (HTTP/1.x)
+            version = getattr(response.raw, "version", None)
+            logger.debug("%s %s -> %s (HTTP version %s)", request.method, request.url, response.status_code, version)
+        return response
+
+def _configure_session(session):
+    """Mount a pooled adapter so every Canvas request reuses keep-alive connections."""
+    adapter = _CanvasAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+def _page_elements(paginated, response):
+    """Build the canvasapi objects for one page of a paginated listing."""
+    data = response.json()
+    if paginated._root:
+        data = data[paginated._root]
+    elements = []
+    for element in data:
+        if element is not None:
+            element.update(paginated._extra_attribs)
+            elements.append(paginated._content_class(paginated._requester, element))
+    return elements
+
+def _numbered_page_urls(response):
+    """List the URLs of pages 2..N if Canvas numbered the pages of this listing.
+
+    Canvas only sends a rel="last" link with a numeric page for some
+    endpoints; others use opaque bookmarks and must be walked in order.
+    """
+    last = response.links.get("last")
+    if "next" not in response.links or last is None:
+        return None
+    parts = urlsplit(last["url"])
+    query = parse_qsl(parts.query)
+    pages = [value for key, value in query if key == "page"]
+    if len(pages) != 1 or not pages[0].isdigit():
+        return None
+    urls = []
+    for page in range(2, int(pages[0]) + 1):
+        page_query = [(key, str(page) if key == "page" else value) for key, value in query]
+        urls.append(urlunsplit(parts._replace(query=urlencode(page_query))))
+    return urls
+
+def fetch_all_pages(paginated) -> list:
+    """Materialize a canvasapi PaginatedList, fetching its pages concurrently.
+
+    PaginatedList follows rel="next" links one page at a time. When Canvas
+    reports a numbered last page, pages 2..N are requested in parallel
+    instead; otherwise this falls back to iterating the list.
+
+    Args:
+        paginated: A PaginatedList returned by a canvasapi get_* call
+
+    Returns:
+        A list of every element in the listing
+    """
+    requester = paginated._requester
+    if paginated._request_method != "GET" or paginated._url_override:
+        return list(paginated)
+
+    # Copy the params: canvasapi extends and rewrites _kwargs in place
+    params = dict(paginated._first_params)
+    if "_kwargs" in params:
+        params["_kwargs"] = list(params["_kwargs"])
+    first = requester.request("GET", paginated._first_url, **params)
+    page_urls = _numbered_page_urls(first)
+    if page_urls is None:
+        # Walk the listing normally; its first page is now a response cache hit
+        return list(paginated)
+
+    workers = min(PAGE_FETCH_WORKERS, len(page_urls))
+    logger.debug("Fetching %s more pages of %s with %s workers", len(page_urls), paginated._first_url, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        responses = list(executor.map(lambda url: requester.request("GET", _url=url), page_urls))
+
+    elements = _page_elements(paginated, first)
+    for response in responses:
+        elements.extend(_page_elements(paginated, response))
+    return elements
+
+def get_course_ref(course_id: int) -> Course:
+    """Build a canvasapi Course for course_id without fetching the course itself.
+
+    canvas.get_course() downloads the full course record, which is wasted
+    when a tool only needs to list something under the course. A missing
+    course still raises ResourceDoesNotExist from the listing request.
+    """
+    return Course(get_canvas()._Canvas__requester, {"id": course_id})
+
+def prefetch_courses():
+    """Fetch the active course list so it lands in the response cache.
+
+    Most aggregate tools start by listing the active courses; this is the
+    same request, so a prefetch takes it off their critical path.
+    """
+    courses = fetch_all_pages(get_canvas().get_courses(enrollment_state='active'))
+    logger.debug("Prefetched %s courses", len(courses))
+
+def get_session():
+    """Get the HTTP session shared by the Canvas client.
+
+    Use this for direct downloads (file bodies, previews) so they share
+    the same connection pool as the API calls.
+    """
+    return get_canvas()._Canvas__requester._session
+
+@atexit.register
+def close_canvas():
+    """Close the shared HTTP session and the disk response cache."""
+    global _canvas, _disk_cache
+    if _canvas is not None:
+        _canvas._Canvas__requester._session.close()
+        _canvas = None
+    if _disk_cache is not None:
+        _disk_cache.close()
+        _disk_cache = None
+
 async def check_auth():
     """Check if authentication is valid."""
     try:
         canvas = get_canvas()
         # Add debugging information
-        logger.info(f"Checking authentication with URL: {CANVAS_BASE_URL} and token: {CANVAS_API_TOKEN[:5]}...")
+        logger.info("Checking authentication with URL: %s and token: %s...", CANVAS_BASE_URL, CANVAS_API_TOKEN[:5])
         
         user = canvas.get_current_user()
         
@@ -51,6 +620,9 @@ async def check_auth():
         logger.error(f"Unexpected authentication error: {e}")
         return {"status": "error", "message": f"Unexpected error: {str(e)}"}
 
+# Values returned from get_object_data unchanged, without recursing into them
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
 def get_object_data(obj):
     """
     Safely extract data from a canvasapi object.
@@ -58,23 +630,23 @@ def get_object_data(obj):
     This handles the case where we need to serialize the object
     for JSON responses in the MCP tools.
     """
-    # If the object is None, return None
-    if obj is None:
-        return None
+    # Primitives (and None) are returned as-is
+    if isinstance(obj, _PRIMITIVE_TYPES):
+        return obj
         
     # If the object is a list, process each item
     if isinstance(obj, list):
         return [get_object_data(item) for item in obj]
         
-    # If the object has __dict__, it's likely a Canvas object
-    if hasattr(obj, '__dict__'):
-        # Extract the internal dict but skip private attributes
-        result = {}
-        # Try to get all attributes that don't start with underscore
-        for key, value in obj.__dict__.items():
-            if not key.startswith('_'):
-                result[key] = get_object_data(value)
-        return result
+    # If the object has __dict__, it's likely a Canvas object: copy its public
+    # attributes, only recursing into values that aren't primitives
+    attributes = getattr(obj, '__dict__', None)
+    if attributes is not None:
+        return {
+            key: value if isinstance(value, _PRIMITIVE_TYPES) else get_object_data(value)
+            for key, value in attributes.items()
+            if not key.startswith('_')
+        }
         
-    # For primitive types, dictionaries, or other JSON-serializable items
-    return obj 
\ No newline at end of file
+    # For dictionaries, datetimes or other JSON-serializable items
+    return obj
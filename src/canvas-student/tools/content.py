@@ -1,15 +1,41 @@
 """Content-related tools for Canvas MCP."""
+import asyncio
 from datetime import datetime, timedelta
+from functools import lru_cache
+import itertools
 import logging
-from typing import List, Dict, Any, Optional
-from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotExist
+import re
+import time
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple, Union
+from canvasapi.exceptions import CanvasException, Forbidden, Unauthorized, ResourceDoesNotExist
 
 # Get logger
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from tools.utils import cached
-from tools.canvas_client import get_canvas, get_object_data
+from tools.utils import cached, single_flight, to_columnar
+from tools.canvas_client import get_course_ref, get_object_data, fetch_all_pages
+
+# Error message templates for each status _handle_canvas_error reports
+_ERROR_MESSAGES = {
+    # This is specifically a permissions issue
+    "unauthorized": "You don't have permission to {action}. This might be because you are a student and this action requires instructor privileges.",
+    "not_found": "The requested resource was not found. This could be because the course doesn't exist or you don't have access to it.",
+    "canvas_error": "{error}",
+    "unknown_error": "Unexpected error while {action}: {error}",
+}
+
+@lru_cache(maxsize=256)
+def _error_status(exc_type: type) -> str:
+    """Classify an exception type into the status reported for it."""
+    if issubclass(exc_type, Unauthorized):
+        return "unauthorized"
+    elif issubclass(exc_type, ResourceDoesNotExist):
+        return "not_found"
+    elif issubclass(exc_type, CanvasException):
+        return "canvas_error"
+    else:
+        return "unknown_error"
 
 def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
     """Helper function to provide better error messages for Canvas API errors.
@@ -21,34 +47,123 @@ def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
     Returns:
         A dictionary with error information
     """
-    if isinstance(e, Unauthorized):
-        # This is specifically a permissions issue
-        return {
-            "error": f"You don't have permission to {action}. This might be because you are a student and this action requires instructor privileges.",
-            "status": "unauthorized",
-            "original_error": str(e)
-        }
-    elif isinstance(e, ResourceDoesNotExist):
-        return {
-            "error": f"The requested resource was not found. This could be because the course doesn't exist or you don't have access to it.",
-            "status": "not_found",
-            "original_error": str(e)
-        }
-    elif isinstance(e, CanvasException):
-        return {
-            "error": str(e),
-            "status": "canvas_error",
-            "original_error": str(e)
-        }
-    else:
-        return {
-            "error": f"Unexpected error while {action}: {str(e)}",
-            "status": "unknown_error",
-            "original_error": str(e)
-        }
+    status = _error_status(type(e))
+    error = str(e)
+    return {
+        "error": _ERROR_MESSAGES[status].format(action=action, error=error),
+        "status": status,
+        "original_error": error
+    }
+
+# Maximum number of files or pages fetched at once within one course
+CONTENT_FETCH_CONCURRENCY = 16
+
+async def _fetch_each(fn: Callable, keys: List[Any]) -> List[Any]:
+    """Call a blocking canvasapi fetch for each key concurrently.
+    
+    Args:
+        fn: Blocking function called with each key in a worker thread
+        keys: Arguments to call fn with
+        
+    Returns:
+        Results in the same order as keys. A fetch that raised maps to the
+        exception, so one failing fetch doesn't sink the rest.
+    """
+    semaphore = asyncio.Semaphore(CONTENT_FETCH_CONCURRENCY)
+    
+    async def fetch_one(key):
+        async with semaphore:
+            return await asyncio.to_thread(fn, key)
+    
+    return await asyncio.gather(*(fetch_one(key) for key in keys), return_exceptions=True)
+
+# Files Canvas reported missing or off-limits, as (course ID, file ID) -> expiry
+# time, so dead links in course content aren't re-requested on every scan
+MISSING_FILE_TTL = 600
+_missing_files: Dict[Tuple[int, int], float] = {}
+
+async def _get_files(course, course_id: int, file_ids: List[int]) -> List[Tuple[int, Any]]:
+    """Fetch files by ID concurrently, skipping ones recently found missing.
+    
+    Args:
+        course: The canvasapi Course the files belong to
+        course_id: The Canvas course ID
+        file_ids: IDs of the files to fetch
+        
+    Returns:
+        (file ID, file) pairs. The file is the exception if its fetch failed.
+    """
+    now = time.monotonic()
+    for key in [(course_id, file_id) for file_id in file_ids]:
+        if _missing_files.get(key, now) < now:
+            del _missing_files[key]
+    file_ids = [file_id for file_id in file_ids if (course_id, file_id) not in _missing_files]
+    
+    results = list(zip(file_ids, await _fetch_each(course.get_file, file_ids)))
+    for file_id, file in results:
+        # Only remember permanent failures; timeouts and server errors may pass
+        if isinstance(file, (ResourceDoesNotExist, Unauthorized, Forbidden)):
+            _missing_files[(course_id, file_id)] = now + MISSING_FILE_TTL
+    return results
+
+async def _get_page_bodies(course) -> List[str]:
+    """Fetch the HTML body of every page in a course.
+    
+    Bodies come with the page listing; pages Canvas listed without one are
+    fetched individually, concurrently.
+    """
+    bodies = []
+    page_urls = []
+    pages = await asyncio.to_thread(fetch_all_pages, course.get_pages(include=['body']))
+    for page in pages:
+        if body := getattr(page, 'body', None):
+            bodies.append(body)
+        elif not hasattr(page, 'body'):
+            page_urls.append(page.url)
+    for full_page in await _fetch_each(course.get_page, page_urls):
+        if isinstance(full_page, Exception):
+            logger.warning(f"Error getting page content: {full_page}")
+        elif body := getattr(full_page, 'body', None):
+            bodies.append(body)
+    return bodies
+
+def _list_module_file_ids(course) -> List[int]:
+    """List the IDs of files linked from a course's modules."""
+    file_ids = []
+    # Ask for each module's items with the module listing itself
+    for module in fetch_all_pages(course.get_modules(include=['items', 'content_details'])):
+        items = getattr(module, 'items', None)
+        if items is None:
+            # Canvas leaves the items out of very large modules
+            items = [get_object_data(item) for item in fetch_all_pages(module.get_module_items())]
+        # Find file type items
+        file_ids.extend(item['content_id'] for item in items if item.get('type') == 'File')
+    return file_ids
+
+def _list_assignment_html(course) -> List[str]:
+    """List the HTML descriptions of a course's assignments."""
+    assignments = fetch_all_pages(course.get_assignments())
+    return [description for a in assignments if (description := getattr(a, 'description', None))]
+
+def _list_announcement_html(course) -> List[str]:
+    """List the HTML messages of a course's announcements."""
+    announcements = fetch_all_pages(course.get_discussion_topics(only_announcements=True))
+    return [message for a in announcements if (message := getattr(a, 'message', None))]
+
+async def _get_folder_files(course) -> List[Any]:
+    """List the files in every folder of a course, fetching folders concurrently."""
+    folders = await asyncio.to_thread(fetch_all_pages, course.get_folders())
+    files = []
+    folder_files = await _fetch_each(lambda folder: fetch_all_pages(folder.get_files()), folders)
+    for folder, result in zip(folders, folder_files):
+        if isinstance(result, Exception):
+            logger.warning(f"Error getting files from folder {folder.name}: {result}")
+        else:
+            files.extend(result)
+    return files
 
 @cached()
-async def get_course_files(course_id: int) -> List[Dict[str, Any]]:
+async def get_course_files(course_id: int, columnar: bool = False) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
     """Get all files for a specific course that the student can access.
     
     This comprehensive approach examines multiple Canvas locations where files might be:
@@ -57,98 +172,68 @@ async def get_course_files(course_id: int) -> List[Dict[str, Any]]:
     3. Files embedded in assignment descriptions
     4. Files embedded in course pages
     5. Files in announcements
+    
+    Set columnar to get one list of values per field instead of one dict per
+    file, which is much smaller for courses with many files.
     """
-    logger.info(f"Fetching files for course {course_id}")
+    logger.info("Fetching files for course %s", course_id)
     all_files = []
     file_ids = set()  # Track discovered file IDs to avoid duplicates
+    linked_file_ids = {}  # File IDs to fetch individually, in discovery order
     
     try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
+        course = get_course_ref(course_id)
         
-        # Method 1: Get files through modules (often works for students)
-        try:
-            logger.info("Attempting to get files via course modules")
-            modules = list(course.get_modules())
-            
-            for module in modules:
-                module_items = list(module.get_module_items())
-                for item in module_items:
-                    # Find file type items
-                    if item.type == 'File':
-                        try:
-                            file_id = item.content_id
-                            if file_id not in file_ids:
-                                file_ids.add(file_id)
-                                file = course.get_file(file_id)
-                                all_files.append(file)
-                        except Exception as file_err:
-                            logger.warning(f"Could not retrieve file {item.title}: {file_err}")
-        except Exception as e:
-            logger.warning(f"Module-based file access failed: {e}")
-            
-        # Method 2: Get files through folders (sometimes works for students)
-        try:
-            logger.info("Attempting to get files via course folders")
-            folders = list(course.get_folders())
+        # The sources are independent, so list them all at once:
+        # 1. modules (often works for students), 2. folders (sometimes works
+        # for students), 3. assignment descriptions and 4. page bodies
+        logger.info("Listing course modules, folders, assignments and pages")
+        module_file_ids, folder_files, assignment_html, page_bodies = await asyncio.gather(
+            asyncio.to_thread(_list_module_file_ids, course),
+            _get_folder_files(course),
+            asyncio.to_thread(_list_assignment_html, course),
+            _get_page_bodies(course),
+            return_exceptions=True
+        )
+        
+        # Method 1: Get files through modules
+        if isinstance(module_file_ids, Exception):
+            logger.warning(f"Module-based file access failed: {module_file_ids}")
+        else:
+            for file_id in module_file_ids:
+                linked_file_ids.setdefault(file_id, "module")
             
-            for folder in folders:
-                try:
-                    folder_files = list(folder.get_files())
-                    for file in folder_files:
-                        if file.id not in file_ids:
-                            file_ids.add(file.id)
-                            all_files.append(file)
-                except Exception as folder_err:
-                    logger.warning(f"Error getting files from folder {folder.name}: {folder_err}")
-        except Exception as e:
-            logger.warning(f"Folder-based file access failed: {e}")
+        # Method 2: Get files through folders
+        if isinstance(folder_files, Exception):
+            logger.warning(f"Folder-based file access failed: {folder_files}")
+        else:
+            for file in folder_files:
+                if file.id not in file_ids:
+                    file_ids.add(file.id)
+                    all_files.append(file)
         
         # Method 3: Extract file links from assignments
-        try:
-            logger.info("Extracting file links from assignments")
-            assignments = list(course.get_assignments())
-            file_ids_from_html = await extract_file_ids_from_html(course_id, 
-                                                                [a.description for a in assignments if hasattr(a, 'description') and a.description])
-            
-            for file_id in file_ids_from_html:
-                if file_id not in file_ids:
-                    try:
-                        file_ids.add(file_id)
-                        file = course.get_file(file_id)
-                        all_files.append(file)
-                    except Exception as file_err:
-                        logger.warning(f"Could not retrieve file {file_id} from assignment: {file_err}")
-        except Exception as e:
-            logger.warning(f"Assignment-based file extraction failed: {e}")
+        if isinstance(assignment_html, Exception):
+            logger.warning(f"Assignment-based file extraction failed: {assignment_html}")
+        else:
+            for file_id in await extract_file_ids_from_html(course_id, assignment_html):
+                linked_file_ids.setdefault(file_id, "assignment")
         
         # Method 4: Extract file links from pages
-        try:
-            logger.info("Extracting file links from pages")
-            pages = list(course.get_pages())
-            page_bodies = []
-            
-            for page in pages:
-                try:
-                    # Need to get the full page to access body content
-                    full_page = course.get_page(page.url)
-                    if hasattr(full_page, 'body') and full_page.body:
-                        page_bodies.append(full_page.body)
-                except Exception as page_err:
-                    logger.warning(f"Error getting page content: {page_err}")
-            
-            file_ids_from_pages = await extract_file_ids_from_html(course_id, page_bodies)
-            
-            for file_id in file_ids_from_pages:
-                if file_id not in file_ids:
-                    try:
-                        file_ids.add(file_id)
-                        file = course.get_file(file_id)
-                        all_files.append(file)
-                    except Exception as file_err:
-                        logger.warning(f"Could not retrieve file {file_id} from page: {file_err}")
-        except Exception as e:
-            logger.warning(f"Page-based file extraction failed: {e}")
+        if isinstance(page_bodies, Exception):
+            logger.warning(f"Page-based file extraction failed: {page_bodies}")
+        else:
+            for file_id in await extract_file_ids_from_html(course_id, page_bodies):
+                linked_file_ids.setdefault(file_id, "page")
+        
+        # Fetch the linked files the folders didn't already return, concurrently
+        pending = [file_id for file_id in linked_file_ids if file_id not in file_ids]
+        for file_id, file in await _get_files(course, course_id, pending):
+            if isinstance(file, Exception):
+                logger.warning(f"Could not retrieve file {file_id} from {linked_file_ids[file_id]}: {file}")
+            else:
+                file_ids.add(file_id)
+                all_files.append(file)
             
         # If we got here with empty all_files, we couldn't retrieve any files
         if not all_files:
@@ -158,7 +243,8 @@ async def get_course_files(course_id: int) -> List[Dict[str, Any]]:
                 "status": "not_found"
             }
             
-        return [get_object_data(file) for file in all_files]
+        files = [get_object_data(file) for file in all_files]
+        return to_columnar(files) if columnar else files
     except Unauthorized as e:
         logger.error(f"Unauthorized access to course {course_id}: {e}")
         return _handle_canvas_error(e, f"access files for course {course_id}")
@@ -172,48 +258,42 @@ async def get_course_files(course_id: int) -> List[Dict[str, Any]]:
         logger.error(f"Unexpected error fetching files: {e}")
         return _handle_canvas_error(e, f"retrieve files for course {course_id}")
 
-async def extract_file_ids_from_html(course_id: int, html_contents: List[str]) -> List[int]:
+@lru_cache(maxsize=64)
+def _file_url_pattern(course_id: int) -> re.Pattern:
+    """Compiled pattern matching Canvas file URLs for one course."""
+    # Matches URLs like https://chalmers.instructure.com/courses/27849/files/3025924
+    return re.compile(rf'https?://[^/]+/courses/{course_id}/files/(\d+)')
+
+async def extract_file_ids_from_html(course_id: int, html_contents: Iterable[str]) -> List[int]:
     """
     Extract file IDs from HTML content by looking for Canvas file URLs.
     
     Args:
         course_id: The Canvas course ID 
-        html_contents: List of HTML strings to parse
+        html_contents: HTML strings to parse
     
     Returns:
-        List of file IDs extracted from the HTML
+        List of unique file IDs extracted from the HTML, in order of appearance
     """
-    import re
-    file_ids = []
-    
-    # Pattern to match Canvas file URLs like:
-    # https://chalmers.instructure.com/courses/27849/files/3025924
-    pattern = rf'https?://[^/]+/courses/{course_id}/files/(\d+)'
-    
-    for html in html_contents:
-        if not html:
-            continue
-            
-        # Find all matches in the current HTML content
-        matches = re.findall(pattern, html)
-        for match in matches:
-            try:
-                file_id = int(match)
-                file_ids.append(file_id)
-            except ValueError:
-                logger.warning(f"Invalid file ID extracted: {match}")
-    
-    return file_ids
+    pattern = _file_url_pattern(course_id)
+    # The pattern only captures digits, so int() can't fail
+    return list(dict.fromkeys(
+        int(match.group(1))
+        for html in html_contents if html
+        for match in pattern.finditer(html)
+    ))
 
 @cached()
-async def get_course_modules(course_id: int) -> List[Dict[str, Any]]:
-    """Get all modules for a specific course."""
-    logger.info(f"Fetching modules for course {course_id}")
+async def get_course_modules(course_id: int, columnar: bool = False) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """Get all modules for a specific course.
+    
+    Set columnar to get one list of values per field instead of one dict per module.
+    """
+    logger.info("Fetching modules for course %s", course_id)
     try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        modules = list(course.get_modules())
-        return [get_object_data(module) for module in modules]
+        course = get_course_ref(course_id)
+        modules = [get_object_data(module) for module in fetch_all_pages(course.get_modules())]
+        return to_columnar(modules) if columnar else modules
     except Unauthorized as e:
         logger.error(f"Unauthorized access to course modules {course_id}: {e}")
         return _handle_canvas_error(e, f"access modules for course {course_id}")
@@ -230,13 +310,11 @@ async def get_course_modules(course_id: int) -> List[Dict[str, Any]]:
 @cached()
 async def get_module_items(course_id: int, module_id: int) -> List[Dict[str, Any]]:
     """Get all items in a specific module."""
-    logger.info(f"Fetching items for module {module_id} in course {course_id}")
+    logger.info("Fetching items for module %s in course %s", module_id, course_id)
     try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
+        course = get_course_ref(course_id)
         module = course.get_module(module_id)
-        items = list(module.get_module_items())
-        return [get_object_data(item) for item in items]
+        return [get_object_data(item) for item in fetch_all_pages(module.get_module_items())]
     except Unauthorized as e:
         logger.error(f"Unauthorized access to module items for course {course_id}, module {module_id}: {e}")
         return _handle_canvas_error(e, f"access items in module {module_id}")
@@ -251,14 +329,20 @@ async def get_module_items(course_id: int, module_id: int) -> List[Dict[str, Any
         return _handle_canvas_error(e, f"retrieve items from module {module_id}")
 
 @cached()
-async def get_course_pages(course_id: int) -> List[Dict[str, Any]]:
-    """Get all pages for a specific course."""
-    logger.info(f"Fetching pages for course {course_id}")
+async def get_course_pages(course_id: int, columnar: bool = False) -> Union[List[Dict[str, Any]], Dict[str, List[Any]]]:
+    """Get all pages for a specific course.
+    
+    Set columnar to get one list of values per field instead of one dict per page.
+    """
+    logger.info("Fetching pages for course %s", course_id)
+    def fetch():
+        course = get_course_ref(course_id)
+        return [get_object_data(page) for page in fetch_all_pages(course.get_pages())]
+    
     try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        pages = list(course.get_pages())
-        return [get_object_data(page) for page in pages]
+        # canvasapi is blocking; run it off the event loop so callers can fan out
+        pages = await asyncio.to_thread(fetch)
+        return to_columnar(pages) if columnar else pages
     except Unauthorized as e:
         logger.error(f"Unauthorized access to course pages {course_id}: {e}")
         return _handle_canvas_error(e, f"access pages for course {course_id}")
@@ -275,11 +359,10 @@ async def get_course_pages(course_id: int) -> List[Dict[str, Any]]:
 @cached()
 async def get_course_announcements(course_id: int, recent_only: bool = True) -> List[Dict[str, Any]]:
     """Get announcements for a specific course."""
-    logger.info(f"Fetching announcements for course {course_id}, recent_only={recent_only}")
+    logger.info("Fetching announcements for course %s, recent_only=%s", course_id, recent_only)
     
-    try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
+    def fetch():
+        course = get_course_ref(course_id)
         
         params = {}
         if recent_only:
@@ -287,9 +370,13 @@ async def get_course_announcements(course_id: int, recent_only: bool = True) ->
             start_date = (datetime.now() - timedelta(days=14)).strftime("%Y-%m-%d")
             params = {"start_date": start_date}
         
-        # Get announcements and convert them to dictionaries
-        announcements = list(course.get_discussion_topics(only_announcements=True, **params))
+        # Get announcements and convert them to dictionaries page by page
+        announcements = fetch_all_pages(course.get_discussion_topics(only_announcements=True, **params))
         return [get_object_data(announcement) for announcement in announcements]
+    
+    try:
+        # canvasapi is blocking; run it off the event loop so callers can fan out
+        return await asyncio.to_thread(fetch)
     except Unauthorized as e:
         logger.error(f"Unauthorized access to course announcements {course_id}: {e}")
         return _handle_canvas_error(e, f"access announcements for course {course_id}")
@@ -303,53 +390,36 @@ async def get_course_announcements(course_id: int, recent_only: bool = True) ->
         logger.error(f"Unexpected error fetching announcements: {e}")
         return _handle_canvas_error(e, f"retrieve announcements for course {course_id}")
 
+@single_flight
 async def get_files_from_content(course_id: int) -> List[Dict[str, Any]]:
     """
     Find all files embedded in course content (assignments, pages, announcements).
     This is particularly useful for students who can access files through content
     but not directly.
     """
-    logger.info(f"Scanning course {course_id} content for embedded files")
+    logger.info("Scanning course %s content for embedded files", course_id)
     try:
-        canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        all_file_ids = set()
+        course = get_course_ref(course_id)
         all_files = []
         
-        # Scan assignments
-        assignments = list(course.get_assignments())
-        assignment_html = [a.description for a in assignments if hasattr(a, 'description') and a.description]
-        
-        # Scan pages
-        pages = list(course.get_pages())
-        page_html = []
-        for page in pages:
-            try:
-                full_page = course.get_page(page.url)
-                if hasattr(full_page, 'body') and full_page.body:
-                    page_html.append(full_page.body)
-            except Exception as e:
-                logger.warning(f"Error getting page content: {e}")
+        # Scan assignments, pages and announcements at once
+        assignment_html, page_html, announcement_html = await asyncio.gather(
+            asyncio.to_thread(_list_assignment_html, course),
+            _get_page_bodies(course),
+            asyncio.to_thread(_list_announcement_html, course)
+        )
         
-        # Scan announcements
-        announcements = list(course.get_discussion_topics(only_announcements=True))
-        announcement_html = [a.message for a in announcements if hasattr(a, 'message') and a.message]
+        # Extract file IDs from all HTML content in one pass, without copying it into one list
+        file_ids = await extract_file_ids_from_html(
+            course_id, itertools.chain(assignment_html, page_html, announcement_html)
+        )
         
-        # Combine all HTML content
-        all_html = assignment_html + page_html + announcement_html
-        
-        # Extract file IDs
-        file_ids = await extract_file_ids_from_html(course_id, all_html)
-        
-        # Retrieve files
-        for file_id in file_ids:
-            if file_id not in all_file_ids:
-                try:
-                    all_file_ids.add(file_id)
-                    file = course.get_file(file_id)
-                    all_files.append(file)
-                except Exception as e:
-                    logger.warning(f"Could not retrieve file {file_id}: {e}")
+        # Retrieve files concurrently
+        for file_id, file in await _get_files(course, course_id, file_ids):
+            if isinstance(file, Exception):
+                logger.warning(f"Could not retrieve file {file_id}: {file}")
+            else:
+                all_files.append(file)
         
         return [get_object_data(file) for file in all_files]
     except Exception as e:
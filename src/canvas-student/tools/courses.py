@@ -8,16 +8,16 @@ logger = logging.getLogger(__name__)
 
 # Import from utils and canvas client
 from tools.utils import cached, format_for_claude
-from tools.canvas_client import get_canvas, get_object_data
+from tools.canvas_client import get_canvas, get_object_data, fetch_all_pages
 
-@cached()
+@cached(stale_ttl=600)
 async def get_courses():
     """Retrieve all courses the user is enrolled in."""
     logger.info("Fetching user courses")
     
     try:
         canvas = get_canvas()
-        courses = list(canvas.get_courses(enrollment_state='active'))
+        courses = fetch_all_pages(canvas.get_courses(enrollment_state='active'))
         
         # Convert to dictionary for JSON serialization
         course_data = [get_object_data(course) for course in courses]
@@ -47,13 +47,9 @@ async def find_course_by_name(course_name: str):
         if isinstance(courses, dict) and "error" in courses:
             return courses
         
-        matches = []
-        for course in courses:
-            # Access name using dictionary syntax or object attribute depending on what's available
-            course_name_value = course.get("name") if isinstance(course, dict) else getattr(course, "name", "")
-            if course_name.lower() in course_name_value.lower():
-                # Convert to dictionary if it's not already
-                matches.append(course if isinstance(course, dict) else get_object_data(course))
+        # get_courses always returns plain dicts; lowercase the query once
+        query = course_name.lower()
+        matches = [course for course in courses if query in (course.get("name") or "").lower()]
         
         if not matches:
             return {"matches": [], "message": f"No courses found matching '{course_name}'", "deprecated": True}
@@ -63,7 +59,7 @@ async def find_course_by_name(course_name: str):
         logger.error(f"Error finding course: {e}")
         return {"error": str(e), "status": "error"}
 
-@cached()
+@cached(stale_ttl=600)
 async def get_course_details(course_id: int) -> Dict[str, Any]:
     """
     Get detailed information about a specific course.
@@ -1,18 +1,32 @@
 """File content extraction tools for Canvas MCP."""
+import asyncio
 import logging
 import io
+import os
 import re
 import json
-from typing import Dict, Any, Union, Optional
+from typing import Dict, Any, Iterator, List, Union, Optional, Tuple
 import requests
+from requests.exceptions import StreamConsumedError
 
 from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotExist
 
+try:
+    import pymupdf
+except ImportError:  # optional, install with the "pdf" extra
+    pymupdf = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup, install with the "speedups" extra
+    orjson = None
+
 # Get logger
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from .canvas_client import get_canvas, get_object_data
+from .utils import cached, load_result, store_result
+from .canvas_client import get_canvas, get_session, get_object_data
 
 def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
     """Helper function to provide better error messages for Canvas API errors.
@@ -50,59 +64,281 @@ def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
             "original_error": str(e)
         }
 
-def _extract_text_from_pdf_preview(preview_content: str) -> str:
-    """
-    Extract readable text from Canvas PDF preview content.
+# Previews wrapped in a JSON object start with "{"
+_JSON_OBJECT_START = re.compile(r'\s*\{')
+
+# PDF structure stripped from previews: Unicode escapes, dictionary objects
+# and object/stream markers
+_UNICODE_ESCAPE_PATTERN = re.compile(r'\\u[0-9a-fA-F]{4}')
+_PDF_DICT_PATTERN = re.compile(r'<</[^>]+>>')
+_PDF_MARKER_PATTERN = re.compile(r'endobj|endstream|startxref|trailer|xref')
+
+# A line of the cleaned preview, between line breaks
+_LINE_PATTERN = re.compile(r'[^\r\n]+')
+
+# Escape sequences left inside extracted lines
+_ESCAPE_SEQUENCE_PATTERN = re.compile(r'\\[^a-zA-Z0-9]')
+
+# Characters that are neither alphanumeric nor whitespace, as a regex (the
+# same classes as str.isalnum and str.isspace) and as ASCII bytes for the
+# much faster bytes.translate path
+_NON_TEXT_CHAR_PATTERN = re.compile(r'[^\w\s]|_')
+_NON_TEXT_ASCII = bytes(c for c in range(128) if not (chr(c).isalnum() or chr(c).isspace()))
+
+# Characters dropped from kept lines, and runs of whitespace to collapse
+_UNREADABLE_CHAR_PATTERN = re.compile(r'[^\w\s.,?!;:()\-\'"]')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def _count_text_chars(line: str) -> int:
+    """Count the alphanumeric and whitespace characters in a line."""
+    if line.isascii():
+        return len(line.encode('ascii').translate(None, _NON_TEXT_ASCII))
+    return len(_NON_TEXT_CHAR_PATTERN.sub('', line))
+
+def _iter_preview_lines(cleaned: str) -> Iterator[str]:
+    """Yield the readable lines of a preview with its PDF structure removed.
     
-    Args:
-        preview_content: Raw preview content from Canvas
-        
-    Returns:
-        str: Extracted text, cleaned up for readability
+    Lines are found and cleaned one at a time, so a caller that stops early
+    leaves the rest of the preview untouched.
     """
-    # First check if it's JSON-formatted
-    try:
-        # If the content is JSON, it might have the PDF content inside it
-        data = json.loads(preview_content)
-        if isinstance(data, dict) and "content" in data:
-            preview_content = data["content"]
-    except (json.JSONDecodeError, TypeError):
-        # Not JSON, continue with raw content
-        pass
-    
-    # Find potential text content in the PDF data
-    extracted_text = []
-    
-    # Remove PDF structural elements and binary markers
-    cleaned = re.sub(r'\\u[0-9a-fA-F]{4}', ' ', preview_content)  # Replace Unicode escapes
-    cleaned = re.sub(r'<</[^>]+>>', '', cleaned)  # Remove PDF dictionary objects
-    cleaned = re.sub(r'endobj|endstream|startxref|trailer|xref', '\n', cleaned)  # Replace PDF markers with newlines
-    
-    # Extract lines that have a good ratio of printable characters
-    lines = cleaned.split('\\n')
-    for line in lines:
+    for match in _LINE_PATTERN.finditer(cleaned):
+        line = match.group()
         # Skip PDF header, binary data indicators and very short lines
         if line.startswith('%PDF') or len(line.strip()) < 5:
             continue
             
         # Clean up the line
-        clean_line = re.sub(r'\\[^a-zA-Z0-9]', ' ', line)  # Replace escape sequences
+        clean_line = _ESCAPE_SEQUENCE_PATTERN.sub(' ', line)  # Replace escape sequences
         
         # Only keep lines with a good proportion of alphanumeric characters
-        if sum(c.isalnum() or c.isspace() for c in clean_line) > len(clean_line) * 0.3:
+        if _count_text_chars(clean_line) > len(clean_line) * 0.3:
             # Further clean up for readability
-            clean_line = re.sub(r'[^\w\s.,?!;:()\-\'"]', ' ', clean_line)
-            clean_line = re.sub(r'\s+', ' ', clean_line).strip()
+            clean_line = _UNREADABLE_CHAR_PATTERN.sub(' ', clean_line)
+            clean_line = _WHITESPACE_PATTERN.sub(' ', clean_line).strip()
             
             if clean_line and len(clean_line) > 10:  # Only meaningful content
-                extracted_text.append(clean_line)
+                yield clean_line
+
+def _extract_text_from_pdf_preview(preview_content: str, max_length: int = 10000) -> str:
+    """
+    Extract readable text from Canvas PDF preview content.
+    
+    Args:
+        preview_content: Raw preview content from Canvas
+        max_length: Stop collecting lines once this many characters are extracted
+        
+    Returns:
+        str: Extracted text, cleaned up for readability
+    """
+    # First check if it's a JSON object; raw previews aren't parsed at all
+    if _JSON_OBJECT_START.match(preview_content):
+        try:
+            # If the content is JSON, it might have the PDF content inside it
+            data = orjson.loads(preview_content) if orjson is not None else json.loads(preview_content)
+            if isinstance(data, dict) and "content" in data:
+                preview_content = data["content"]
+        except (ValueError, TypeError):
+            # Not JSON (orjson and json decode errors are ValueErrors), continue with raw content
+            pass
+    
+    # Remove PDF structural elements and binary markers
+    cleaned = _UNICODE_ESCAPE_PATTERN.sub(' ', preview_content)  # Replace Unicode escapes
+    cleaned = _PDF_DICT_PATTERN.sub('', cleaned)  # Remove PDF dictionary objects
+    cleaned = _PDF_MARKER_PATTERN.sub('\n', cleaned)  # Replace PDF markers with newlines
+    
+    # Lines are separated by real line breaks (including those the markers
+    # became) and by literal backslash-n sequences left in previews that
+    # weren't JSON-decoded
+    cleaned = cleaned.replace('\\n', '\n')
+    
+    # Collect lines that have a good ratio of printable characters, stopping
+    # once there's more than the caller will return
+    extracted_text = []
+    total = 0
+    for line in _iter_preview_lines(cleaned):
+        extracted_text.append(line)
+        total += len(line) + 1
+        if total >= max_length:
+            break
     
     if not extracted_text:
         return "Could not extract readable text from this PDF. Please use the source URL to view the original file."
     
     return "\n".join(extracted_text)
 
-def get_file_content(file_id=None, file_url=None, max_length=10000):
+# Extensions of files returned as text whatever their MIME type
+TEXT_FILE_EXTENSIONS = frozenset(('.txt', '.md', '.csv', '.json'))
+
+# Bytes read per chunk when streaming a file
+READ_CHUNK_SIZE = 65536
+
+# Seconds the extracted content of a file version is kept on disk. Keys
+# include the file's updated_at, so a changed file is never served stale.
+FILE_CONTENT_TTL = 7 * 24 * 3600
+
+# Largest PDF downloaded for text extraction; bigger ones use Canvas's preview
+MAX_PDF_SIZE = 50 * 1024 * 1024
+
+# MIME types that say nothing about the content; such files are identified
+# from their first bytes instead
+GENERIC_MIME_TYPES = frozenset(('application/octet-stream', 'binary/octet-stream', 'application/download'))
+
+# Bytes read to identify a file with a generic MIME type
+SNIFF_SIZE = 512
+
+# Leading bytes of the file types handled here, with their MIME types
+FILE_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+def _sniff_mime_type(head: bytes) -> Optional[str]:
+    """Guess a MIME type from the first bytes of a file.
+    
+    Returns:
+        The MIME type, "text/plain" for NUL-free UTF-8, or None if unknown
+    """
+    for signature, mime_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head and b'\x00' not in head:
+        try:
+            # The head may end partway through a multi-byte character
+            head.decode('utf-8')
+            return 'text/plain'
+        except UnicodeDecodeError as e:
+            if e.start >= len(head) - 3 and e.reason == 'unexpected end of data':
+                return 'text/plain'
+    return None
+
+def _is_generic_mime_type(mime_type: str) -> bool:
+    """Check whether a MIME type says nothing about the file's content."""
+    return mime_type.partition(';')[0].strip().lower() in GENERIC_MIME_TYPES
+
+def _classify_file(mime_type: Optional[str], extension: str) -> Tuple[bool, bool, bool]:
+    """Tell from a MIME type and lowercase extension whether a file is a PDF, text or an image.
+    
+    Returns:
+        (is_pdf, is_text, is_image)
+    """
+    mime_type_lower = (mime_type or '').lower()
+    is_pdf = 'pdf' in mime_type_lower or extension == '.pdf'
+    is_text = 'text/' in mime_type_lower or extension in TEXT_FILE_EXTENSIONS
+    is_image = 'image/' in mime_type_lower
+    return is_pdf, is_text, is_image
+
+def _open_file(session, file_url: str, limit: Optional[int] = None):
+    """Start streaming a file download.
+    
+    Args:
+        session: The shared Canvas HTTP session
+        file_url: URL of the file
+        limit: If given, only the first limit bytes are requested, uncompressed
+            so the byte count matches what is decoded
+        
+    Returns:
+        The streamed (stream=True) response
+    """
+    if limit is None:
+        response = session.get(file_url, stream=True)
+    else:
+        response = session.get(
+            file_url, stream=True, headers={'Range': f'bytes=0-{limit - 1}', 'Accept-Encoding': 'identity'}
+        )
+        if response.status_code == 416:
+            # An empty file has no byte range to return
+            response.close()
+            response = session.get(file_url, stream=True)
+    response.raise_for_status()
+    return response
+
+def _read_head(response, size: int) -> bytes:
+    """Read the first size bytes (or a little more) of a streamed response."""
+    head = bytearray()
+    for chunk in response.iter_content(chunk_size=size):
+        head += chunk
+        if len(head) >= size:
+            break
+    return bytes(head)
+
+def _read_body(response, limit: int, head: bytes = b'') -> bytearray:
+    """Read at most limit bytes of a streamed response, then release its connection.
+    
+    head holds bytes already read from the response with _read_head.
+    """
+    body = bytearray(head)
+    try:
+        try:
+            chunks = response.iter_content(chunk_size=READ_CHUNK_SIZE)
+        except StreamConsumedError:
+            # _read_head already read the whole (short) file
+            chunks = ()
+        for chunk in chunks:
+            body += chunk
+            if len(body) >= limit:
+                break
+    finally:
+        # Hand the connection back to the pool without reading the rest
+        response.close()
+    return body
+
+def _extract_text_from_pdf(pdf_bytes: bytes, max_length: int) -> str:
+    """Extract a PDF's text layer with PyMuPDF, stopping after max_length characters."""
+    pages = []
+    total = 0
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as document:
+        for page in document:
+            text = page.get_text("text")
+            pages.append(text)
+            total += len(text)
+            if total >= max_length:
+                break
+    return "".join(pages).strip()
+
+def _text_byte_budget(max_length: int) -> int:
+    """Bytes to read for max_length characters of text.
+    
+    A character takes at most 4 bytes; one more byte tells whether there's more.
+    """
+    return max_length * 4 + 1
+
+def _total_size(response) -> Optional[int]:
+    """Size of the whole file in bytes, as reported by the response headers.
+    
+    A ranged (206) response gives it after the slash of its Content-Range;
+    a full (200) response gives it as Content-Length. None if neither does.
+    """
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    length = response.headers.get('Content-Length', '')
+    if response.status_code == 200 and length.isdigit():
+        return int(length)
+    return None
+
+def _read_text(response, max_length: int, head: bytes = b'') -> Tuple[str, Optional[int]]:
+    """Read just enough of a streamed response to return max_length characters.
+    
+    Args:
+        response: A streamed (stream=True) requests response
+        max_length: Maximum number of characters to return
+        head: Bytes already read from the response
+        
+    Returns:
+        The text, cut to max_length characters, and the length of the whole
+        text, or None if the file is longer than what was read
+    """
+    budget = _text_byte_budget(max_length)
+    body = _read_body(response, budget, head)
+    text = body.decode(response.encoding or 'utf-8', errors='replace')
+    content_length = len(text) if len(body) < budget else None
+    return text[:max_length], content_length
+
+@cached()
+async def get_file_content(file_id=None, file_url=None, max_length=10000):
     """
     Get file content from Canvas with Claude-optimized output formatting.
     
@@ -114,6 +350,50 @@ def get_file_content(file_id=None, file_url=None, max_length=10000):
     Returns:
         dict: Information about the file with Claude-friendly formatting
     """
+    # The download is blocking; run it off the event loop
+    return await asyncio.to_thread(_fetch_file_content, file_id, file_url, max_length)
+
+async def get_file_contents(file_ids: List[int], max_length: int = 10000) -> Dict[int, Dict[str, Any]]:
+    """
+    Get the content of several Canvas files at once.
+    
+    Args:
+        file_ids: The Canvas file IDs
+        max_length: Maximum length of content to return per file
+        
+    Returns:
+        dict: The get_file_content result for each file, keyed by file ID
+    """
+    # Downloads run concurrently; the shared session paces them against Canvas
+    file_ids = list(dict.fromkeys(file_ids))
+    results = await asyncio.gather(
+        *(get_file_content(file_id=file_id, max_length=max_length) for file_id in file_ids),
+        return_exceptions=True
+    )
+    return {
+        file_id: _handle_canvas_error(result, f"extract content from file {file_id}") if isinstance(result, Exception) else result
+        for file_id, result in zip(file_ids, results)
+    }
+
+def _file_result(content: str, file_name: str, mime_type: str, file_url: str, **flags) -> Dict[str, Any]:
+    """Build a successful get_file_content result; flags describe the kind of file."""
+    return {
+        "success": True,
+        "content": content,
+        "file_name": file_name,
+        "mime_type": mime_type,
+        "source": file_url,
+        **flags
+    }
+
+def _file_content_key(file_id, updated_at, max_length) -> Optional[str]:
+    """Key for the stored content of one version of a file, or None if it has no version."""
+    if not file_id or not updated_at:
+        return None
+    return f"file_content:{file_id}:{updated_at}:{max_length}"
+
+def _fetch_file_content(file_id, file_url, max_length):
+    """Download a file and format its content (the body of get_file_content)."""
     logger.info(f"Getting file content for file ID {file_id} or URL {file_url}")
     
     if not file_id and not file_url:
@@ -121,8 +401,8 @@ def get_file_content(file_id=None, file_url=None, max_length=10000):
     
     try:
         canvas = get_canvas()
-        # Get the underlying session for direct requests
-        session = canvas._Canvas__requester._session
+        # Reuse the pooled session for direct requests
+        session = get_session()
         
         # Get file metadata if only ID is provided
         if file_id and not file_url:
@@ -131,149 +411,169 @@ def get_file_content(file_id=None, file_url=None, max_length=10000):
                 file_url = file.url
                 file_name = file.display_name
                 mime_type = getattr(file, 'content-type', None)
-                
-                # Generate a direct preview URL
-                preview_url = f"{file.url}&preview=1" if '?' in file.url else f"{file.url}?preview=1"
+                updated_at = getattr(file, 'updated_at', None)
                 
             except Exception as e:
                 logger.error(f"Could not get file with ID {file_id}: {str(e)}")
                 return _handle_canvas_error(e, f"access file with ID {file_id}")
         else:
             # Try to extract file name from URL
-            file_name = file_url.split('/')[-1].split('?')[0]
+            file_name = file_url.rpartition('/')[2].partition('?')[0]
             mime_type = None
+            updated_at = None
         
-        # Stream the file directly to memory
-        response = session.get(file_url, stream=True)
-        response.raise_for_status()
+        # Extracted content is kept on disk per file version, so it's only
+        # downloaded again once the file changes
+        key = _file_content_key(file_id, updated_at, max_length)
+        if key is not None:
+            result = load_result(key)
+            if result is not None:
+                logger.debug("Using stored content of file %s", file_id)
+                return result
+        
+        result = _read_file_content(session, file_url, file_name, mime_type, max_length)
+        if key is not None:
+            store_result(key, result, FILE_CONTENT_TTL)
+        return result
+        
+    except Exception as e:
+        logger.error(f"Error getting file content: {str(e)}")
+        return _handle_canvas_error(e, f"extract content from file")
+
+def _read_file_content(session, file_url, file_name, mime_type, max_length):
+    """Download a file and format its content for Claude."""
+    # Classify the file from its metadata where Canvas provided it
+    extension = os.path.splitext(file_name)[1].lower()
+    is_pdf, is_text, is_image = _classify_file(mime_type, extension)
+    
+    # Images and other files that are only linked to aren't downloaded at
+    # all; the body is only fetched when it's read or the type is unknown
+    response = None
+    if not mime_type or _is_generic_mime_type(mime_type) or is_text or (is_pdf and pymupdf is not None):
+        response = _open_file(session, file_url, _text_byte_budget(max_length) if is_text else None)
         
         # Set mime type from response headers if not already available
         if not mime_type:
             mime_type = response.headers.get('Content-Type', 'application/octet-stream')
+            is_pdf, is_text, is_image = _classify_file(mime_type, extension)
+    
+    # Canvas often serves uploads as application/octet-stream; when neither
+    # the MIME type nor the extension tells, look at the first bytes
+    head = b''
+    if response is not None and not (is_pdf or is_text or is_image) and _is_generic_mime_type(mime_type):
+        head = _read_head(response, SNIFF_SIZE)
+        sniffed = _sniff_mime_type(head)
+        if sniffed:
+            mime_type = sniffed
+            is_pdf, is_text, is_image = _classify_file(sniffed, extension)
+    
+    # Only text files (and PDFs, when PyMuPDF is installed) are read;
+    # release the connection for everything else
+    if response is not None and not is_text and not (is_pdf and pymupdf is not None):
+        response.close()
+    
+    # Create Claude-friendly content formatting
+    if is_text:
+        # For text files, simply return the content
+        try:
+            text_content, content_length = _read_text(response, max_length, head)
+            truncated = content_length is None or content_length > max_length
+            # Only part of a long file is downloaded; its size comes from the headers
+            total_size = _total_size(response) if content_length is None else None
+            
+            # Format nicely for Claude with metadata header
+            formatted_content = (
+                f"<file name=\"{file_name}\" type=\"{mime_type}\">\n"
+                f"{text_content}\n"
+                f"</file>"
+            )
+            
+            if truncated:
+                formatted_content += f"\n\n[Note: This file has been truncated to {max_length} characters."
+                if content_length is not None:
+                    formatted_content += f" The original is {content_length} characters long."
+                elif total_size is not None:
+                    formatted_content += f" The original file is {total_size} bytes."
+                formatted_content += "]"
+            
+            return _file_result(
+                formatted_content, file_name, mime_type, file_url,
+                truncated=truncated, content_length=content_length if content_length is not None else total_size,
+                is_text=True
+            )
+        except Exception as content_error:
+            logger.warning(f"Error extracting text content: {content_error}")
+            # Fall through to the general case
+    
+    # For PDF files, try to give better context
+    if is_pdf:
+        extracted_text = None
         
-        # Simplified file type handling - Claude-optimized approach
-        is_pdf = 'pdf' in mime_type.lower() or file_name.lower().endswith('.pdf')
-        is_text = ('text/' in mime_type.lower() or 
-                   any(file_name.lower().endswith(ext) for ext in ['.txt', '.md', '.csv', '.json']))
-        is_image = 'image/' in mime_type.lower()
-        
-        # Create Claude-friendly content formatting
-        if is_text:
-            # For text files, simply return the content
+        # Read the PDF's own text layer when PyMuPDF is installed
+        if pymupdf is not None:
             try:
-                text_content = response.text[:max_length]
-                truncated = len(response.text) > max_length
-                
-                # Format nicely for Claude with metadata header
-                formatted_content = (
-                    f"<file name=\"{file_name}\" type=\"{mime_type}\">\n"
-                    f"{text_content}\n"
-                    f"</file>"
-                )
-                
-                if truncated:
-                    formatted_content += f"\n\n[Note: This file has been truncated to {max_length} characters. The original is {len(response.text)} characters long.]"
-                
-                return {
-                    "success": True,
-                    "content": formatted_content,
-                    "truncated": truncated,
-                    "content_length": len(response.text),
-                    "file_name": file_name,
-                    "mime_type": mime_type,
-                    "source": file_url,
-                    "is_text": True
-                }
-            except Exception as content_error:
-                logger.warning(f"Error extracting text content: {content_error}")
-                # Fall through to the general case
+                pdf_bytes = _read_body(response, MAX_PDF_SIZE + 1, head)
+                if len(pdf_bytes) <= MAX_PDF_SIZE:
+                    extracted_text = _extract_text_from_pdf(pdf_bytes, max_length)
+                else:
+                    logger.info(f"{file_name} is larger than {MAX_PDF_SIZE} bytes, using the Canvas preview")
+            except Exception as pdf_error:
+                logger.warning(f"Error extracting PDF text: {pdf_error}")
         
-        # For PDF files, try to give better context
-        if is_pdf:
-            # Try to extract some preview information if possible
+        # Otherwise try to extract some preview information if possible
+        if not extracted_text or len(extracted_text) <= 50:
             try:
                 # Request the preview version
-                preview_url = f"{file_url}&preview=1" if '?' in file_url else f"{file_url}?preview=1"
+                preview_url = f"{file_url}{'&' if '?' in file_url else '?'}preview=1"
                 preview_response = session.get(preview_url, stream=True)
                 
                 if preview_response.ok:
                     # Try to extract text from the preview
-                    extracted_text = _extract_text_from_pdf_preview(preview_response.text)
-                    if extracted_text and len(extracted_text) > 50:  # Only if we got something meaningful
-                        # Format for Claude as a PDF document with extracted text
-                        formatted_content = (
-                            f"<PDF_DOCUMENT name=\"{file_name}\">\n"
-                            f"EXTRACTED_TEXT:\n{extracted_text[:max_length]}\n\n"
-                            f"[This is an extracted preview of the PDF content. For the full document, use the URL: {file_url}]\n"
-                            f"</PDF_DOCUMENT>"
-                        )
-                        
-                        return {
-                            "success": True,
-                            "content": formatted_content,
-                            "file_name": file_name,
-                            "mime_type": mime_type,
-                            "source": file_url,
-                            "extracted_text": True,
-                            "is_pdf": True
-                        }
+                    extracted_text = _extract_text_from_pdf_preview(preview_response.text, max_length)
             except Exception as pdf_error:
                 logger.warning(f"Error extracting PDF preview: {pdf_error}")
-            
-            # If extraction failed or wasn't possible, return a helpful message
+        
+        if extracted_text and len(extracted_text) > 50:  # Only if we got something meaningful
+            # Format for Claude as a PDF document with extracted text
             formatted_content = (
                 f"<PDF_DOCUMENT name=\"{file_name}\">\n"
-                f"This is a PDF document available in Canvas.\n\n"
-                f"URL: {file_url}\n\n"
-                f"I cannot display the full contents directly, but I can help you with questions about this document if you've reviewed it.\n"
+                f"EXTRACTED_TEXT:\n{extracted_text[:max_length]}\n\n"
+                f"[This is an extracted preview of the PDF content. For the full document, use the URL: {file_url}]\n"
                 f"</PDF_DOCUMENT>"
             )
             
-            return {
-                "success": True,
-                "content": formatted_content,
-                "file_name": file_name,
-                "mime_type": mime_type,
-                "source": file_url,
-                "is_pdf": True
-            }
-        
-        # For images, provide a descriptive message
-        if is_image:
-            formatted_content = (
-                f"<IMAGE name=\"{file_name}\" type=\"{mime_type}\">\n"
-                f"[This is an image file available in Canvas.]\n\n"
-                f"URL: {file_url}\n\n"
-                f"I cannot display this image directly, but you can view it by following the URL above.\n"
-                f"</IMAGE>"
-            )
-            
-            return {
-                "success": True,
-                "content": formatted_content,
-                "file_name": file_name,
-                "mime_type": mime_type,
-                "source": file_url,
-                "is_image": True
-            }
+            return _file_result(formatted_content, file_name, mime_type, file_url, extracted_text=True, is_pdf=True)
         
-        # For other file types, provide a general message
+        # If extraction failed or wasn't possible, return a helpful message
         formatted_content = (
-            f"<FILE name=\"{file_name}\" type=\"{mime_type}\">\n"
-            f"This file is available in Canvas, but I cannot display its contents directly.\n\n"
+            f"<PDF_DOCUMENT name=\"{file_name}\">\n"
+            f"This is a PDF document available in Canvas.\n\n"
             f"URL: {file_url}\n\n"
-            f"You can download or view this file by following the URL above.\n"
-            f"</FILE>"
+            f"I cannot display the full contents directly, but I can help you with questions about this document if you've reviewed it.\n"
+            f"</PDF_DOCUMENT>"
         )
         
-        return {
-            "success": True,
-            "content": formatted_content,
-            "file_name": file_name,
-            "mime_type": mime_type,
-            "source": file_url
-        }
+        return _file_result(formatted_content, file_name, mime_type, file_url, is_pdf=True)
+    
+    # For images, provide a descriptive message
+    if is_image:
+        formatted_content = (
+            f"<IMAGE name=\"{file_name}\" type=\"{mime_type}\">\n"
+            f"[This is an image file available in Canvas.]\n\n"
+            f"URL: {file_url}\n\n"
+            f"I cannot display this image directly, but you can view it by following the URL above.\n"
+            f"</IMAGE>"
+        )
         
-    except Exception as e:
-        logger.error(f"Error getting file content: {str(e)}")
-        return _handle_canvas_error(e, f"extract content from file") 
\ No newline at end of file
+        return _file_result(formatted_content, file_name, mime_type, file_url, is_image=True)
+    
+    # For other file types, provide a general message
+    formatted_content = (
+        f"<FILE name=\"{file_name}\" type=\"{mime_type}\">\n"
+        f"This file is available in Canvas, but I cannot display its contents directly.\n\n"
+        f"URL: {file_url}\n\n"
+        f"You can download or view this file by following the URL above.\n"
+        f"</FILE>"
+    )
+    
+    return _file_result(formatted_content, file_name, mime_type, file_url)
@@ -1,5 +1,6 @@
 """Quiz-related tools for Canvas MCP."""
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime, timedelta, timezone
 import logging
 from typing import List, Dict, Any, Optional
 from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotExist
@@ -8,8 +9,8 @@ from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotE
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from tools.utils import cached, format_for_claude
-from tools.canvas_client import get_canvas, get_object_data
+from tools.utils import cached, fetch_all_courses, format_for_claude
+from tools.canvas_client import get_canvas, get_course_ref, get_object_data, fetch_all_pages
 
 def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
     """Helper function to provide better error messages for Canvas API errors.
@@ -47,13 +48,100 @@ def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
             "original_error": str(e)
         }
 
+def _time_limit_info(time_limit) -> str:
+    """Describe a quiz's time limit, or an empty string if it has none."""
+    return f" - Time Limit: {time_limit} minutes" if time_limit else ""
+
+def _attempts_info(allowed_attempts) -> str:
+    """Describe a quiz's allowed attempts, or an empty string if not set."""
+    if not allowed_attempts:
+        return ""
+    if allowed_attempts == -1:
+        return " - Unlimited attempts"
+    return f" - {allowed_attempts} attempt(s)"
+
+def _upcoming_quiz_line(quiz: Dict[str, Any], due_date: datetime, seconds_until: float) -> str:
+    """Format an upcoming quiz of a course as one line for Claude."""
+    title = quiz.get('title', 'Unnamed quiz')
+    points = quiz.get('points_possible', 'No points')
+    time_limit = quiz.get('time_limit')
+    question_count = quiz.get('question_count', 'Unknown')
+    
+    # Format date to be more readable
+    days_until, seconds_into_day = divmod(int(seconds_until), 86400)
+    hours_until = seconds_into_day // 3600
+    
+    if days_until == 0:
+        if hours_until == 0:
+            time_until = "Due today (in less than an hour)"
+        elif hours_until == 1:
+            time_until = "Due today (in 1 hour)"
+        else:
+            time_until = f"Due today (in {hours_until} hours)"
+    elif days_until == 1:
+        time_until = "Due tomorrow"
+    else:
+        time_until = f"Due in {days_until} days"
+    
+    date_info = f" - Due: {due_date.strftime('%b %d, %Y at %I:%M %p')} ({time_until})"
+    
+    # Add question count if available
+    questions_info = f" - {question_count} questions" if question_count != 'Unknown' else ""
+    
+    # Format quiz details, with time limit and attempts info if available
+    return (f"📝 {title}{date_info} - Points: {points}{_time_limit_info(time_limit)}"
+            f"{_attempts_info(quiz.get('allowed_attempts'))}{questions_info}")
+
+def _available_quiz_line(quiz: Dict[str, Any]) -> str:
+    """Format an available quiz of a course as one line for Claude."""
+    title = quiz.get('title', 'Unnamed quiz')
+    points = quiz.get('points_possible', 'No points')
+    time_limit = quiz.get('time_limit')
+    
+    # Format quiz details, with time limit and attempts info if available
+    return (f"✅ {title} - Available now - Points: {points}{_time_limit_info(time_limit)}"
+            f"{_attempts_info(quiz.get('allowed_attempts'))}")
+
+def _upcoming_course_quiz_line(quiz: Dict[str, Any], due_date: datetime, seconds_until: float) -> str:
+    """Format an upcoming quiz, with its course, as one line for Claude."""
+    title = quiz.get('title', 'Unnamed quiz')
+    course_name = quiz.get('course_name', 'Unknown course')
+    points = quiz.get('points_possible', 'No points')
+    time_limit = quiz.get('time_limit')
+    
+    # Format date to be more readable
+    days_until = int(seconds_until) // 86400
+    
+    if days_until == 0:
+        time_until = "Due today"
+    elif days_until == 1:
+        time_until = "Due tomorrow"
+    else:
+        time_until = f"Due in {days_until} days"
+    
+    date_info = f" - Due: {due_date.strftime('%b %d')} ({time_until})"
+    
+    # Format quiz details, with time limit if available
+    return f"📝 {title} - Course: {course_name}{date_info} - Points: {points}{_time_limit_info(time_limit)}"
+
+def _available_course_quiz_line(quiz: Dict[str, Any]) -> str:
+    """Format an available quiz, with its course, as one line for Claude."""
+    title = quiz.get('title', 'Unnamed quiz')
+    course_name = quiz.get('course_name', 'Unknown course')
+    points = quiz.get('points_possible', 'No points')
+    time_limit = quiz.get('time_limit')
+    
+    # Format quiz details, with time limit if available
+    return f"✅ {title} - Course: {course_name} - Available now - Points: {points}{_time_limit_info(time_limit)}"
+
 @cached(ttl=300)
-async def get_course_quizzes(course_id: int):
+async def get_course_quizzes(course_id: int, course_name: Optional[str] = None):
     """
     Get information about quizzes in a specific course.
     
     Args:
         course_id: The Canvas course ID
+        course_name: The course's name, if already known (saves looking it up)
         
     Returns:
         dict: Information about quizzes with Claude-friendly formatting
@@ -62,24 +150,38 @@ async def get_course_quizzes(course_id: int):
     
     try:
         canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        quizzes = list(course.get_quizzes())
-        
-        # Convert to dictionary for JSON serialization
-        quiz_data = [get_object_data(quiz) for quiz in quizzes]
         
-        # Categorize quizzes
-        now = datetime.now()
-        upcoming_quizzes = []
+        # canvasapi is blocking; run it off the event loop so get_all_quizzes
+        # can fetch many courses at once. The quizzes are listed without
+        # fetching the course record. Unless the caller passed the course name,
+        # it comes from the active course list (normally already in the
+        # response cache), or from the course record for courses not in it.
+        def fetch():
+            quizzes = fetch_all_pages(get_course_ref(course_id).get_quizzes())
+            if course_name is not None:
+                return course_name, quizzes
+            course_names = {c.id: c.name for c in fetch_all_pages(canvas.get_courses(enrollment_state='active'))}
+            name = course_names.get(course_id)
+            if name is None:
+                name = canvas.get_course(course_id).name
+            return name, quizzes
+        
+        name, quizzes = await asyncio.to_thread(fetch)
+        
+        # Convert published quizzes to dictionaries for JSON serialization;
+        # unpublished ones are skipped before they are converted or cached
+        quiz_data = [get_object_data(quiz) for quiz in quizzes if getattr(quiz, 'published', None) is not False]
+        
+        # Categorize and format quizzes in one pass. Upcoming ones are kept as
+        # (due timestamp, quiz, line) so they can be sorted by due date. Dates
+        # are compared as epoch seconds against a single "now".
+        now_ts = datetime.now(timezone.utc).timestamp()
+        upcoming = []
         available_quizzes = []
+        available_items = []
         past_quizzes = []
         
         for quiz in quiz_data:
-            # Check quiz status
-            if quiz.get('published') is False:
-                # Skip unpublished quizzes
-                continue
-                
             due_at = quiz.get('due_at')
             unlock_at = quiz.get('unlock_at')
             lock_at = quiz.get('lock_at')
@@ -89,16 +191,14 @@ async def get_course_quizzes(course_id: int):
             
             if unlock_at:
                 try:
-                    unlock_date = datetime.fromisoformat(unlock_at.replace('Z', '+00:00'))
-                    if unlock_date > now:
+                    if datetime.fromisoformat(unlock_at).timestamp() > now_ts:
                         is_available_now = False
                 except (ValueError, TypeError) as e:
                     logger.warning(f"Could not parse unlock date for quiz {quiz.get('id')}: {e}")
             
             if lock_at and is_available_now:
                 try:
-                    lock_date = datetime.fromisoformat(lock_at.replace('Z', '+00:00'))
-                    if lock_date < now:
+                    if datetime.fromisoformat(lock_at).timestamp() < now_ts:
                         is_available_now = False
                 except (ValueError, TypeError) as e:
                     logger.warning(f"Could not parse lock date for quiz {quiz.get('id')}: {e}")
@@ -106,9 +206,11 @@ async def get_course_quizzes(course_id: int):
             # Check due date to categorize as upcoming or past
             if due_at:
                 try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    if due_date > now:
-                        upcoming_quizzes.append(quiz)
+                    due_date = datetime.fromisoformat(due_at)
+                    due_ts = due_date.timestamp()
+                    if due_ts > now_ts:
+                        line = _upcoming_quiz_line(quiz, due_date, due_ts - now_ts)
+                        upcoming.append((due_ts, quiz, line))
                     else:
                         past_quizzes.append(quiz)
                 except (ValueError, TypeError) as e:
@@ -117,91 +219,17 @@ async def get_course_quizzes(course_id: int):
                     # If we can't parse the date, consider it as an available quiz
                     if is_available_now:
                         available_quizzes.append(quiz)
+                        available_items.append(_available_quiz_line(quiz))
             else:
                 # If no due date, consider it as an available quiz
                 if is_available_now:
                     available_quizzes.append(quiz)
+                    available_items.append(_available_quiz_line(quiz))
         
         # Sort upcoming quizzes by due date
-        upcoming_quizzes.sort(key=lambda x: x.get('due_at', ''))
-        
-        # Format quiz information for Claude
-        upcoming_items = []
-        for quiz in upcoming_quizzes:
-            title = quiz.get('title', 'Unnamed quiz')
-            due_at = quiz.get('due_at')
-            points = quiz.get('points_possible', 'No points')
-            time_limit = quiz.get('time_limit')
-            allowed_attempts = quiz.get('allowed_attempts')
-            question_count = quiz.get('question_count', 'Unknown')
-            
-            # Format date to be more readable
-            date_info = ""
-            if due_at:
-                try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    days_until = (due_date - now).days
-                    hours_until = ((due_date - now).seconds // 3600)
-                    
-                    if days_until == 0:
-                        if hours_until == 0:
-                            time_until = "Due today (in less than an hour)"
-                        elif hours_until == 1:
-                            time_until = "Due today (in 1 hour)"
-                        else:
-                            time_until = f"Due today (in {hours_until} hours)"
-                    elif days_until == 1:
-                        time_until = "Due tomorrow"
-                    else:
-                        time_until = f"Due in {days_until} days"
-                    
-                    date_info = f" - Due: {due_date.strftime('%b %d, %Y at %I:%M %p')} ({time_until})"
-                except (ValueError, TypeError):
-                    date_info = f" - Due: {due_at}"
-            
-            # Format quiz details
-            quiz_info = f"📝 {title}{date_info} - Points: {points}"
-            
-            # Add time limit if available
-            if time_limit:
-                quiz_info += f" - Time Limit: {time_limit} minutes"
-                
-            # Add attempts info if available
-            if allowed_attempts:
-                if allowed_attempts == -1:
-                    quiz_info += f" - Unlimited attempts"
-                else:
-                    quiz_info += f" - {allowed_attempts} attempt(s)"
-                    
-            # Add question count if available
-            if question_count != 'Unknown':
-                quiz_info += f" - {question_count} questions"
-                
-            upcoming_items.append(quiz_info)
-        
-        # Format available quizzes
-        available_items = []
-        for quiz in available_quizzes:
-            title = quiz.get('title', 'Unnamed quiz')
-            points = quiz.get('points_possible', 'No points')
-            time_limit = quiz.get('time_limit')
-            allowed_attempts = quiz.get('allowed_attempts')
-            
-            # Format quiz details
-            quiz_info = f"✅ {title} - Available now - Points: {points}"
-            
-            # Add time limit if available
-            if time_limit:
-                quiz_info += f" - Time Limit: {time_limit} minutes"
-                
-            # Add attempts info if available
-            if allowed_attempts:
-                if allowed_attempts == -1:
-                    quiz_info += f" - Unlimited attempts"
-                else:
-                    quiz_info += f" - {allowed_attempts} attempt(s)"
-                    
-            available_items.append(quiz_info)
+        upcoming.sort(key=lambda entry: entry[0])
+        upcoming_quizzes = [quiz for _, quiz, _ in upcoming]
+        upcoming_items = [line for _, _, line in upcoming]
         
         # Create items for Claude output
         all_items = []
@@ -222,7 +250,7 @@ async def get_course_quizzes(course_id: int):
             all_items.append("No upcoming or available quizzes found in this course.")
         
         # Create summary for output
-        summary = f"Found {len(upcoming_quizzes)} upcoming and {len(available_quizzes)} available quizzes in {course.name}"
+        summary = f"Found {len(upcoming_quizzes)} upcoming and {len(available_quizzes)} available quizzes in {name}"
         
         # Format for Claude
         formatted_output = format_for_claude(
@@ -234,7 +262,7 @@ async def get_course_quizzes(course_id: int):
                 'past_quizzes': len(past_quizzes)
             },
             type_name="COURSE_QUIZZES",
-            title=f"Quizzes for {course.name}",
+            title=f"Quizzes for {name}",
             summary=summary,
             items=all_items
         )
@@ -270,24 +298,34 @@ async def get_all_quizzes():
     
     try:
         canvas = get_canvas()
-        courses = list(canvas.get_courses(enrollment_state='active'))
+        courses = fetch_all_pages(canvas.get_courses(enrollment_state='active'))
         
-        now = datetime.now()
-        upcoming_quizzes = []
+        # Categorize and format quizzes in one pass. Upcoming ones are kept as
+        # (due timestamp, quiz, line) so they can be sorted by due date. Dates
+        # are compared as epoch seconds against a single "now".
+        now_ts = datetime.now(timezone.utc).timestamp()
+        upcoming = []
         available_quizzes = []
+        available_items = []
+        
+        # Fetch every course's quizzes concurrently through get_course_quizzes,
+        # passing the names already listed here so it doesn't look them up
+        async def fetch_course_quizzes(course):
+            return await get_course_quizzes(course.id, course.name)
+        
+        results_by_course = await fetch_all_courses(fetch_course_quizzes, courses)
         
         for course in courses:
+            result = results_by_course[course.id]
+            if isinstance(result, Exception) or "error" in result:
+                error = result if isinstance(result, Exception) else result["error"]
+                logger.warning(f"Could not get quizzes for course {course.id}: {error}")
+                continue
             try:
-                quizzes = list(course.get_quizzes())
-                
-                for quiz in quizzes:
-                    quiz_data = get_object_data(quiz)
-                    quiz_data['course_name'] = course.name
-                    quiz_data['course_id'] = course.id
-                    
-                    # Skip unpublished quizzes
-                    if quiz_data.get('published') is False:
-                        continue
+                # get_course_quizzes only returns published quizzes
+                for quiz in result["quizzes"]:
+                    # Copy before tagging; the listing is shared through the cache
+                    quiz_data = dict(quiz, course_name=course.name, course_id=course.id)
                         
                     # Check availability
                     due_at = quiz_data.get('due_at')
@@ -299,16 +337,14 @@ async def get_all_quizzes():
                     
                     if unlock_at:
                         try:
-                            unlock_date = datetime.fromisoformat(unlock_at.replace('Z', '+00:00'))
-                            if unlock_date > now:
+                            if datetime.fromisoformat(unlock_at).timestamp() > now_ts:
                                 is_available_now = False
                         except (ValueError, TypeError):
                             pass
                     
                     if lock_at and is_available_now:
                         try:
-                            lock_date = datetime.fromisoformat(lock_at.replace('Z', '+00:00'))
-                            if lock_date < now:
+                            if datetime.fromisoformat(lock_at).timestamp() < now_ts:
                                 is_available_now = False
                         except (ValueError, TypeError):
                             pass
@@ -316,79 +352,33 @@ async def get_all_quizzes():
                     # Check due date to categorize
                     if due_at:
                         try:
-                            due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                            if due_date > now:
+                            due_date = datetime.fromisoformat(due_at)
+                            due_ts = due_date.timestamp()
+                            if due_ts > now_ts:
                                 # Upcoming quiz
-                                upcoming_quizzes.append(quiz_data)
+                                line = _upcoming_course_quiz_line(quiz_data, due_date, due_ts - now_ts)
+                                upcoming.append((due_ts, quiz_data, line))
                             elif is_available_now:
                                 # Past due but still available
                                 available_quizzes.append(quiz_data)
+                                available_items.append(_available_course_quiz_line(quiz_data))
                         except (ValueError, TypeError):
                             # If we can't parse the date and it's available, add to available
                             if is_available_now:
                                 available_quizzes.append(quiz_data)
+                                available_items.append(_available_course_quiz_line(quiz_data))
                     else:
                         # No due date but available
                         if is_available_now:
                             available_quizzes.append(quiz_data)
+                            available_items.append(_available_course_quiz_line(quiz_data))
             except Exception as e:
                 logger.warning(f"Could not get quizzes for course {course.id}: {e}")
         
         # Sort upcoming quizzes by due date
-        upcoming_quizzes.sort(key=lambda x: x.get('due_at', ''))
-        
-        # Format upcoming quizzes for Claude
-        upcoming_items = []
-        for quiz in upcoming_quizzes:
-            title = quiz.get('title', 'Unnamed quiz')
-            course_name = quiz.get('course_name', 'Unknown course')
-            due_at = quiz.get('due_at')
-            points = quiz.get('points_possible', 'No points')
-            time_limit = quiz.get('time_limit')
-            
-            # Format date to be more readable
-            date_info = ""
-            if due_at:
-                try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    days_until = (due_date - now).days
-                    
-                    if days_until == 0:
-                        time_until = "Due today"
-                    elif days_until == 1:
-                        time_until = "Due tomorrow"
-                    else:
-                        time_until = f"Due in {days_until} days"
-                    
-                    date_info = f" - Due: {due_date.strftime('%b %d')} ({time_until})"
-                except (ValueError, TypeError):
-                    date_info = f" - Due: {due_at}"
-            
-            # Format quiz details
-            quiz_info = f"📝 {title} - Course: {course_name}{date_info} - Points: {points}"
-            
-            # Add time limit if available
-            if time_limit:
-                quiz_info += f" - Time Limit: {time_limit} minutes"
-                
-            upcoming_items.append(quiz_info)
-        
-        # Format available quizzes
-        available_items = []
-        for quiz in available_quizzes:
-            title = quiz.get('title', 'Unnamed quiz')
-            course_name = quiz.get('course_name', 'Unknown course')
-            points = quiz.get('points_possible', 'No points')
-            time_limit = quiz.get('time_limit')
-            
-            # Format quiz details
-            quiz_info = f"✅ {title} - Course: {course_name} - Available now - Points: {points}"
-            
-            # Add time limit if available
-            if time_limit:
-                quiz_info += f" - Time Limit: {time_limit} minutes"
-                
-            available_items.append(quiz_info)
+        upcoming.sort(key=lambda entry: entry[0])
+        upcoming_quizzes = [quiz for _, quiz, _ in upcoming]
+        upcoming_items = [line for _, _, line in upcoming]
         
         # Create items for Claude output
         all_items = []
@@ -441,14 +431,19 @@ async def get_all_quizzes():
             "original_error": str(e)
         }
 
+# Optional parts of get_quiz_details, each fetched with its own requests
+QUIZ_DETAIL_PARTS = ("questions", "submissions")
+
 @cached(ttl=300)
-async def get_quiz_details(course_id: int, quiz_id: int):
+async def get_quiz_details(course_id: int, quiz_id: int, include: Optional[List[str]] = None):
     """
     Get detailed information about a specific quiz.
     
     Args:
         course_id: The Canvas course ID
         quiz_id: The Canvas quiz ID
+        include: Which of "questions" and "submissions" to fetch; both by
+            default. Pass an empty list for just the quiz itself.
         
     Returns:
         dict: Detailed information about the quiz with Claude-friendly formatting
@@ -457,33 +452,35 @@ async def get_quiz_details(course_id: int, quiz_id: int):
     
     try:
         canvas = get_canvas()
-        course = canvas.get_course(course_id)
-        quiz = course.get_quiz(quiz_id)
         
-        # Get quiz data
+        # Get quiz data; canvasapi is blocking, so run it off the event loop
+        quiz = await asyncio.to_thread(lambda: get_course_ref(course_id).get_quiz(quiz_id))
         quiz_data = get_object_data(quiz)
         
-        # Try to get questions if available
-        try:
-            questions = list(quiz.get_questions())
-            question_data = [get_object_data(question) for question in questions]
-            quiz_data['questions'] = question_data
-        except Exception as e:
-            logger.warning(f"Could not get questions for quiz {quiz_id}: {e}")
-            quiz_data['questions'] = []
-        
-        # Try to get submission data if available
-        try:
+        def fetch_questions():
+            return [get_object_data(question) for question in fetch_all_pages(quiz.get_questions())]
+        
+        def fetch_submissions():
             user = canvas.get_current_user()
-            submissions = list(quiz.get_submissions(user_id=user.id))
-            submission_data = [get_object_data(submission) for submission in submissions]
-            quiz_data['submissions'] = submission_data
-        except Exception as e:
-            logger.warning(f"Could not get submissions for quiz {quiz_id}: {e}")
-            quiz_data['submissions'] = []
+            submissions = fetch_all_pages(quiz.get_submissions(user_id=user.id))
+            return [get_object_data(submission) for submission in submissions]
+        
+        # Try to get questions and submission data if available, both at once
+        fetchers = {"questions": fetch_questions, "submissions": fetch_submissions}
+        parts = [part for part in QUIZ_DETAIL_PARTS if include is None or part in include]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(fetchers[part]) for part in parts), return_exceptions=True
+        )
+        for part in QUIZ_DETAIL_PARTS:
+            quiz_data[part] = []
+        for part, result in zip(parts, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not get {part} for quiz {quiz_id}: {result}")
+            else:
+                quiz_data[part] = result
         
         # Format quiz information for Claude
-        now = datetime.now()
+        now = datetime.now(timezone.utc)
         
         # Get basic quiz info
         title = quiz_data.get('title', 'Unnamed quiz')
@@ -502,7 +499,7 @@ async def get_quiz_details(course_id: int, quiz_id: int):
         date_info = []
         if due_at:
             try:
-                due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
+                due_date = datetime.fromisoformat(due_at)
                 if due_date > now:
                     days_until = (due_date - now).days
                     if days_until == 0:
@@ -520,14 +517,14 @@ async def get_quiz_details(course_id: int, quiz_id: int):
         
         if unlock_at:
             try:
-                unlock_date = datetime.fromisoformat(unlock_at.replace('Z', '+00:00'))
+                unlock_date = datetime.fromisoformat(unlock_at)
                 date_info.append(f"Available from: {unlock_date.strftime('%b %d, %Y at %I:%M %p')}")
             except (ValueError, TypeError):
                 date_info.append(f"Available from: {unlock_at}")
         
         if lock_at:
             try:
-                lock_date = datetime.fromisoformat(lock_at.replace('Z', '+00:00'))
+                lock_date = datetime.fromisoformat(lock_at)
                 date_info.append(f"Available until: {lock_date.strftime('%b %d, %Y at %I:%M %p')}")
             except (ValueError, TypeError):
                 date_info.append(f"Available until: {lock_at}")
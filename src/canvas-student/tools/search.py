@@ -1,5 +1,7 @@
 """Search-related tools for Canvas MCP."""
+import asyncio
 import logging
+from functools import partial
 from typing import Dict, List, Any, Union
 from canvasapi.exceptions import CanvasException
 
@@ -7,142 +9,71 @@ from canvasapi.exceptions import CanvasException
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from tools.utils import cached
+from tools.utils import cached, fetch_all_courses, single_flight
 from tools.canvas_client import get_canvas, get_object_data
 from tools.courses import get_courses
 from tools.assignments import get_course_assignments
 from tools.content import get_course_pages, get_course_files, get_course_announcements
 
+# Fields searched in each kind of course content, in the order search_course
+# fetches them
+SEARCH_FIELDS = (
+    ("assignments", ("name", "description")),
+    ("pages", ("title", "body")),
+    ("files", ("display_name",)),
+    ("announcements", ("title", "message")),
+)
+
+def _field_text(item: Any, field: str) -> str:
+    """Read a searchable field from a dict or canvasapi object as a string."""
+    value = item.get(field) if isinstance(item, dict) else getattr(item, field, None)
+    return str(value) if value else ""
+
+def _search_items(items: List[Any], needle: str, fields: tuple) -> List[Dict[str, Any]]:
+    """Find the items with the lowercase needle in any of the fields.
+    
+    Fields are lowercased one at a time, so a long body is only scanned when
+    the title didn't match. Matches are returned as dicts.
+    """
+    return [
+        item if isinstance(item, dict) else get_object_data(item)
+        for item in items
+        if any(needle in _field_text(item, field).lower() for field in fields)
+    ]
+
+@single_flight
 async def search_course(course_id: int, search_term: str) -> Dict[str, Any]:
     """Search for content within a specific course."""
     logger.info(f"Searching course {course_id} for '{search_term}'")
     results = {"course_id": course_id, "results": {}}
+    needle = search_term.lower()
     
-    # Search assignments
-    try:
-        assignments = await get_course_assignments(course_id)
-        
-        # Handle error case
-        if isinstance(assignments, dict) and "error" in assignments:
-            logger.error(f"Error getting assignments for search: {assignments['error']}")
-        else:
-            matching_assignments = []
-            for a in assignments:
-                # Get name and description safely regardless of type
-                if isinstance(a, dict):
-                    name = a.get("name", "").lower()
-                    description = a.get("description", "")
-                else:
-                    name = getattr(a, "name", "").lower()
-                    description = getattr(a, "description", "")
-                
-                # Convert description to string and lowercase
-                description = str(description).lower() if description else ""
-                
-                # Check for matches
-                if search_term.lower() in name or search_term.lower() in description:
-                    # Convert to dict if needed
-                    matching_assignments.append(a if isinstance(a, dict) else get_object_data(a))
-                    
-            if matching_assignments:
-                results["results"]["assignments"] = matching_assignments
-                logger.info(f"Found {len(matching_assignments)} matching assignments")
-    except Exception as e:
-        logger.error(f"Error searching assignments: {e}")
+    # Fetch everything searched at once; each fetch runs off the event loop
+    sources = await asyncio.gather(
+        get_course_assignments(course_id),
+        get_course_pages(course_id),
+        get_course_files(course_id),
+        get_course_announcements(course_id, False),
+        return_exceptions=True
+    )
     
-    # Search pages
-    try:
-        pages = await get_course_pages(course_id)
+    for (kind, fields), items in zip(SEARCH_FIELDS, sources):
+        # Handle error cases
+        if isinstance(items, Exception):
+            logger.error(f"Error searching {kind}: {items}")
+            continue
+        if isinstance(items, dict) and "error" in items:
+            logger.error(f"Error getting {kind} for search: {items['error']}")
+            continue
         
-        # Handle error case
-        if isinstance(pages, dict) and "error" in pages:
-            logger.error(f"Error getting pages for search: {pages['error']}")
-        else:
-            matching_pages = []
-            for p in pages:
-                # Get title and body safely regardless of type
-                if isinstance(p, dict):
-                    title = p.get("title", "").lower()
-                    body = p.get("body", "")
-                else:
-                    title = getattr(p, "title", "").lower()
-                    body = getattr(p, "body", "")
-                
-                # Convert body to string and lowercase
-                body = str(body).lower() if body else ""
-                
-                # Check for matches
-                if search_term.lower() in title or search_term.lower() in body:
-                    # Convert to dict if needed
-                    matching_pages.append(p if isinstance(p, dict) else get_object_data(p))
-                    
-            if matching_pages:
-                results["results"]["pages"] = matching_pages
-                logger.info(f"Found {len(matching_pages)} matching pages")
-    except Exception as e:
-        logger.error(f"Error searching pages: {e}")
-    
-    # Search files
-    try:
-        files = await get_course_files(course_id)
-        
-        # Handle error case
-        if isinstance(files, dict) and "error" in files:
-            logger.error(f"Error getting files for search: {files['error']}")
-        else:
-            matching_files = []
-            for f in files:
-                # Get display_name safely regardless of type
-                if isinstance(f, dict):
-                    display_name = f.get("display_name", "").lower()
-                else:
-                    display_name = getattr(f, "display_name", "").lower()
-                
-                # Check for matches
-                if search_term.lower() in display_name:
-                    # Convert to dict if needed
-                    matching_files.append(f if isinstance(f, dict) else get_object_data(f))
-                    
-            if matching_files:
-                results["results"]["files"] = matching_files
-                logger.info(f"Found {len(matching_files)} matching files")
-    except Exception as e:
-        logger.error(f"Error searching files: {e}")
-    
-    # Search announcements
-    try:
-        announcements = await get_course_announcements(course_id, False)
-        
-        # Handle error case
-        if isinstance(announcements, dict) and "error" in announcements:
-            logger.error(f"Error getting announcements for search: {announcements['error']}")
-        else:
-            matching_announcements = []
-            for a in announcements:
-                # Get title and message safely regardless of type
-                if isinstance(a, dict):
-                    title = a.get("title", "").lower()
-                    message = a.get("message", "")
-                else:
-                    title = getattr(a, "title", "").lower()
-                    message = getattr(a, "message", "")
-                
-                # Convert message to string and lowercase
-                message = str(message).lower() if message else ""
-                
-                # Check for matches
-                if search_term.lower() in title or search_term.lower() in message:
-                    # Convert to dict if needed
-                    matching_announcements.append(a if isinstance(a, dict) else get_object_data(a))
-                    
-            if matching_announcements:
-                results["results"]["announcements"] = matching_announcements
-                logger.info(f"Found {len(matching_announcements)} matching announcements")
-    except Exception as e:
-        logger.error(f"Error searching announcements: {e}")
+        matches = _search_items(items, needle, fields)
+        if matches:
+            results["results"][kind] = matches
+            logger.info(f"Found {len(matches)} matching {kind}")
     
     return results
 
+@single_flight
 async def search_all_courses(search_term: str) -> Dict[str, Dict[str, Any]]:
     """Search across all courses for the specified term."""
     logger.info(f"Searching all courses for '{search_term}'")
@@ -156,18 +87,24 @@ async def search_all_courses(search_term: str) -> Dict[str, Dict[str, Any]]:
         
         all_results = {}
         
-        for course in courses:
-            # Get course id and name safely regardless of type
-            if isinstance(course, dict):
-                course_id = course["id"]
-                course_name = course["name"]
-            else:
-                course_id = course.id
-                course_name = course.name
-                
-            course_results = await search_course(course_id, search_term)
-            if course_results["results"]:
-                all_results[course_name] = course_results["results"]
+        # Get course id and name safely regardless of type
+        pairs = [
+            (course["id"], course["name"]) if isinstance(course, dict) else (course.id, course.name)
+            for course in courses
+        ]
+        
+        # Search all courses concurrently
+        course_results = await fetch_all_courses(
+            partial(search_course, search_term=search_term), [course_id for course_id, _ in pairs]
+        )
+        
+        for course_id, course_name in pairs:
+            result = course_results[course_id]
+            if isinstance(result, Exception):
+                logger.warning(f"Error searching course {course_id}: {result}")
+                continue
+            if result["results"]:
+                all_results[course_name] = result["results"]
         
         logger.info(f"Found matches in {len(all_results)} courses")
         return all_results
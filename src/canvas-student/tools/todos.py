@@ -1,5 +1,5 @@
 """Todo and missing assignments tools for Canvas MCP."""
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import logging
 from typing import List, Dict, Any, Optional
 from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotExist
@@ -8,8 +8,8 @@ from canvasapi.exceptions import CanvasException, Unauthorized, ResourceDoesNotE
 logger = logging.getLogger(__name__)
 
 # Import utilities
-from tools.utils import cached, format_for_claude
-from tools.canvas_client import get_canvas, get_object_data
+from tools.utils import cached, fetch_all_courses, format_for_claude
+from tools.canvas_client import get_canvas, get_object_data, fetch_all_pages
 
 def _handle_canvas_error(e: Exception, action: str) -> Dict[str, Any]:
     """Helper function to provide better error messages for Canvas API errors.
@@ -61,9 +61,16 @@ async def get_todo_items():
         canvas = get_canvas()
         user = canvas.get_current_user()
         
+        # Get course names once; both the todo and missing loops use them
+        try:
+            courses = {c.id: c.name for c in fetch_all_pages(canvas.get_courses(enrollment_state='active'))}
+        except Exception as e:
+            logger.warning(f"Error getting courses: {e}")
+            courses = {}
+        
         # Get todo items
         try:
-            todo_items = list(user.get_todo_items())
+            todo_items = fetch_all_pages(user.get_todo_items())
             todo_data = [get_object_data(item) for item in todo_items]
         except Exception as e:
             logger.warning(f"Error getting todo items: {e}")
@@ -71,11 +78,7 @@ async def get_todo_items():
         
         # Get missing assignments
         try:
-            # Get courses first, so we can add course names to assignments
-            courses = {c.id: c.name for c in canvas.get_courses(enrollment_state='active')}
-            
-            # Get missing assignments
-            missing_items = list(user.get_missing_submissions())
+            missing_items = fetch_all_pages(user.get_missing_submissions())
             missing_data = []
             
             for item in missing_items:
@@ -90,8 +93,8 @@ async def get_todo_items():
             logger.warning(f"Error getting missing assignments: {e}")
             missing_data = []
         
-        # Process todo items
-        now = datetime.now()
+        # Process todo items. Due dates are UTC, so compare them as epoch seconds.
+        now_ts = datetime.now(timezone.utc).timestamp()
         formatted_todos = []
         
         for item in todo_data:
@@ -114,33 +117,31 @@ async def get_todo_items():
             if 'assignment' in item and 'due_at' in item['assignment'] and item['assignment']['due_at']:
                 due_at = item['assignment']['due_at']
                 try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    days_until = (due_date - now).days
-                    hours_until = ((due_date - now).seconds // 3600)
+                    due_date = datetime.fromisoformat(due_at)
+                    days_until, seconds_into_day = divmod(int(due_date.timestamp() - now_ts), 86400)
+                    hours_until = seconds_into_day // 3600
                     
                     if days_until < 0:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (PAST DUE)"
+                        status = " (PAST DUE)"
                     elif days_until == 0:
                         if hours_until <= 1:
-                            date_info = f" - Due: {due_date.strftime('%b %d')} (DUE VERY SOON)"
+                            status = " (DUE VERY SOON)"
                         else:
-                            date_info = f" - Due: {due_date.strftime('%b %d')} (DUE TODAY in {hours_until} hours)"
+                            status = f" (DUE TODAY in {hours_until} hours)"
                     elif days_until == 1:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (DUE TOMORROW)"
+                        status = " (DUE TOMORROW)"
                     elif days_until < 7:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (Due in {days_until} days)"
+                        status = f" (Due in {days_until} days)"
                     else:
-                        date_info = f" - Due: {due_date.strftime('%b %d')}"
+                        status = ""
+                    
+                    date_info = f" - Due: {due_date.strftime('%b %d')}{status}"
                 except (ValueError, TypeError):
                     date_info = f" - Due: {due_at}"
             
             # Format for display
-            if course_name:
-                todo_text = f"📋 {title} - Course: {course_name}{date_info}"
-            else:
-                todo_text = f"📋 {title}{date_info}"
-            
-            formatted_todos.append(todo_text)
+            course_info = f" - Course: {course_name}" if course_name else ""
+            formatted_todos.append(f"📋 {title}{course_info}{date_info}")
         
         # Process missing assignments
         formatted_missing = []
@@ -156,15 +157,17 @@ async def get_todo_items():
             if 'due_at' in item and item['due_at']:
                 due_at = item['due_at']
                 try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    days_since = (now - due_date).days
+                    due_date = datetime.fromisoformat(due_at)
+                    days_since = int(now_ts - due_date.timestamp()) // 86400
                     
                     if days_since < 1:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (DUE TODAY)"
+                        status = " (DUE TODAY)"
                     elif days_since == 1:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (1 day past due)"
+                        status = " (1 day past due)"
                     else:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} ({days_since} days past due)"
+                        status = f" ({days_since} days past due)"
+                    
+                    date_info = f" - Due: {due_date.strftime('%b %d')}{status}"
                 except (ValueError, TypeError):
                     date_info = f" - Due: {due_at}"
             
@@ -237,27 +240,33 @@ async def get_upcoming_todo_items(days: int = 7):
     
     try:
         canvas = get_canvas()
-        user = canvas.get_current_user()
         
         # Get courses
-        courses = list(canvas.get_courses(enrollment_state='active'))
-        course_dict = {c.id: c for c in courses}
+        courses = fetch_all_pages(canvas.get_courses(enrollment_state='active'))
+        
+        # Calculate date range, as epoch seconds (due dates are UTC)
+        now_ts = datetime.now(timezone.utc).timestamp()
+        end_ts = now_ts + days * 86400
+        
+        # Only ask Canvas for assignments due in the future; past ones would be
+        # filtered out below anyway
+        def fetch_future_assignments(course):
+            return [get_object_data(assignment)
+                    for assignment in fetch_all_pages(course.get_assignments(bucket='future'))]
         
-        # Calculate date range
-        now = datetime.now()
-        end_date = now + timedelta(days=days)
+        # Fetch every course's assignments concurrently, each in a worker thread
+        assignments_by_course = await fetch_all_courses(fetch_future_assignments, courses)
         
         # Collect upcoming assignments
         upcoming_assignments = []
         
-        for course_id, course in course_dict.items():
+        for course in courses:
+            assignments = assignments_by_course[course.id]
+            if isinstance(assignments, Exception):
+                logger.warning(f"Could not get assignments for course {course.id}: {assignments}")
+                continue
             try:
-                # Get assignments for the course
-                assignments = list(course.get_assignments())
-                
-                for assignment in assignments:
-                    assignment_data = get_object_data(assignment)
-                    
+                for assignment_data in assignments:
                     # Check if the assignment is published
                     if assignment_data.get('published') is False:
                         continue
@@ -269,10 +278,10 @@ async def get_upcoming_todo_items(days: int = 7):
                     
                     # Parse the due date
                     try:
-                        due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
+                        due_ts = datetime.fromisoformat(due_at).timestamp()
                         
                         # Check if it's in our date range and not past due
-                        if now <= due_date <= end_date:
+                        if now_ts <= due_ts <= end_ts:
                             # Add course name for display
                             assignment_data['course_name'] = course.name
                             upcoming_assignments.append(assignment_data)
@@ -280,7 +289,7 @@ async def get_upcoming_todo_items(days: int = 7):
                         # Skip if we can't parse the date
                         continue
             except Exception as e:
-                logger.warning(f"Could not get assignments for course {course_id}: {e}")
+                logger.warning(f"Could not get assignments for course {course.id}: {e}")
         
         # Sort by due date
         upcoming_assignments.sort(key=lambda x: x.get('due_at', ''))
@@ -299,19 +308,21 @@ async def get_upcoming_todo_items(days: int = 7):
             date_info = ""
             if due_at:
                 try:
-                    due_date = datetime.fromisoformat(due_at.replace('Z', '+00:00'))
-                    days_until = (due_date - now).days
-                    hours_until = ((due_date - now).seconds // 3600)
+                    due_date = datetime.fromisoformat(due_at)
+                    days_until, seconds_into_day = divmod(int(due_date.timestamp() - now_ts), 86400)
+                    hours_until = seconds_into_day // 3600
                     
                     if days_until == 0:
                         if hours_until <= 1:
-                            date_info = f" - Due: {due_date.strftime('%b %d')} (DUE VERY SOON)"
+                            status = " (DUE VERY SOON)"
                         else:
-                            date_info = f" - Due: {due_date.strftime('%b %d')} (DUE TODAY in {hours_until} hours)"
+                            status = f" (DUE TODAY in {hours_until} hours)"
                     elif days_until == 1:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (DUE TOMORROW)"
+                        status = " (DUE TOMORROW)"
                     else:
-                        date_info = f" - Due: {due_date.strftime('%b %d')} (Due in {days_until} days)"
+                        status = f" (Due in {days_until} days)"
+                    
+                    date_info = f" - Due: {due_date.strftime('%b %d')}{status}"
                 except (ValueError, TypeError):
                     date_info = f" - Due: {due_at}"
             
@@ -1,82 +1,312 @@
 """Utility tools for Canvas MCP."""
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
+import inspect
+import pickle
+import sqlite3
 import time
+from collections import OrderedDict
 from functools import wraps
 import logging
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
 from canvasapi.exceptions import CanvasException
 
 # Get logger
 logger = logging.getLogger(__name__)
 
-from tools.canvas_client import get_canvas, get_object_data
+from tools.canvas_client import (
+    get_canvas, get_course_ref, get_object_data, fetch_all_pages, clear_response_cache, disk_cache
+)
 
-# Cache management
-cache: Dict[str, Any] = {}
-cache_ttl: Dict[str, float] = {}
+# Cached results as (fresh-until, keep-until, result), keyed by call, in least
+# to most recently used order. Once MAX_CACHE_ENTRIES is exceeded, expired
+# entries and then the least recently used ones are evicted. Only touched from
+# the event loop, so it needs no lock.
+MAX_CACHE_ENTRIES = 1024
+cache: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
 
-def cached(ttl: int = 300):
+# Keys being refreshed in the background, and the refresh tasks themselves
+# (held so they aren't garbage collected mid-flight)
+_refreshing: Set[str] = set()
+_refresh_tasks: Set[asyncio.Task] = set()
+
+# Futures for cache misses currently being computed, so concurrent callers
+# with the same key wait for one call instead of repeating it
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _is_error(result: Any) -> bool:
+    """Check whether a tool result is an error dict, which shouldn't be cached."""
+    return isinstance(result, dict) and "error" in result
+
+def _remember(key: str, entry: Tuple[float, float, Any]):
+    """Put an entry in the memory cache, evicting old entries if it's full."""
+    cache[key] = entry
+    cache.move_to_end(key)
+    if len(cache) > MAX_CACHE_ENTRIES:
+        now = time.time()
+        for expired in [k for k, (_, keep_until, _) in cache.items() if keep_until <= now]:
+            del cache[expired]
+        while len(cache) > MAX_CACHE_ENTRIES:
+            cache.popitem(last=False)
+
+def _load_persisted(key: str) -> Optional[Tuple[float, float, Any]]:
+    """Read a cached result from disk.
+    
+    Returns:
+        A (fresh-until, keep-until, result) tuple, or None on a miss
+    """
+    try:
+        with disk_cache() as db:
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT expires, value FROM results WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        fresh_until, result = pickle.loads(row[1])
+        return fresh_until, row[0], result
+    except (sqlite3.Error, pickle.UnpicklingError, AttributeError, EOFError, ImportError) as e:
+        logger.warning(f"Error reading cached result for {key} from disk: {e}")
+        return None
+
+def _persist(key: str, fresh_until: float, keep_until: float, result: Any):
+    """Write a cached result through to disk so the next session starts warm."""
+    try:
+        value = pickle.dumps((fresh_until, result), protocol=pickle.HIGHEST_PROTOCOL)
+        with disk_cache() as db:
+            if db is None:
+                return
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, keep_until, value))
+            db.commit()
+    except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as e:
+        logger.warning(f"Error writing cached result for {key} to disk: {e}")
+
+def load_result(key: str) -> Any:
+    """Read a result stored with store_result, or None if it's missing or expired."""
+    entry = _load_persisted(key)
+    return None if entry is None else entry[2]
+
+def store_result(key: str, result: Any, ttl: int):
+    """Store a result on disk for ttl seconds. Error results aren't stored."""
+    if _is_error(result):
+        return
+    expires = time.time() + ttl
+    _persist(key, expires, expires, result)
+
+def _call_key(func: Callable, signature: inspect.Signature, args, kwargs) -> str:
+    """Build a key for a call from the function name and its bound arguments.
+    
+    Defaults are filled in, so equivalent calls get the same key however the
+    arguments were passed.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return f"{func.__qualname__}:{tuple(bound.arguments.values())!r}"
+
+async def _run_once(key: str, call: Callable):
+    """Await call(), or join an identical call already running under key."""
+    pending = _inflight.get(key)
+    if pending is not None:
+        logger.debug("Joining in-flight call for %s", key)
+        return await asyncio.shield(pending)
+    
+    future = _inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await call()
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # Followers re-raise it; don't warn about it going unretrieved
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+def single_flight(func: Callable):
+    """Decorator to share one run of a function between identical concurrent calls.
+    
+    For tools that aren't cached: a call made while an identical one is still
+    running waits for it and gets the same result instead of repeating it.
+    
+    Returns:
+        Decorated function that coalesces concurrent calls
+    """
+    signature = inspect.signature(func)
+    
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = _call_key(func, signature, args, kwargs)
+        return await _run_once(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+def cached(ttl: int = 300, stale_ttl: int = 0):
     """Decorator to cache function results.
     
+    Results are kept in memory and on disk, so they survive server restarts.
+    Error results are never cached.
+    
     Args:
         ttl: Time-to-live in seconds for cached entries
+        stale_ttl: Extra seconds an expired entry may still be returned while it
+            is refreshed in the background (stale-while-revalidate)
         
     Returns:
         Decorated function that uses caching
     """
     def decorator(func: Callable):
+        signature = inspect.signature(func)
+        
+        def store(key: str, result: Any):
+            if _is_error(result):
+                return
+            now = time.time()
+            _remember(key, (now + ttl, now + ttl + stale_ttl, result))
+            _persist(key, now + ttl, now + ttl + stale_ttl, result)
+        
+        async def refresh(key: str, args, kwargs):
+            try:
+                store(key, await func(*args, **kwargs))
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                _refreshing.discard(key)
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            # Create a cache key from function name and arguments
-            key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
+            # Create a cache key from the function name and arguments
+            key = _call_key(func, signature, args, kwargs)
             
-            # Check if cached and not expired
-            if key in cache and time.time() < cache_ttl.get(key, 0):
-                logger.debug(f"Cache hit for {key}")
-                return cache[key]
+            # Warm the memory cache from disk on first use in this process
+            entry = cache.get(key)
+            if entry is None:
+                entry = _load_persisted(key)
+                if entry is not None:
+                    _remember(key, entry)
             
-            # Execute function and cache result
-            logger.debug(f"Cache miss for {key}, executing function")
-            result = await func(*args, **kwargs)
-            cache[key] = result
-            cache_ttl[key] = time.time() + ttl
-            return result
+            if entry is not None:
+                now = time.time()
+                fresh_until, keep_until, result = entry
+                
+                # Check if cached and not expired
+                if now < fresh_until:
+                    logger.debug("Cache hit for %s", key)
+                    cache.move_to_end(key)
+                    return result
+                
+                # Serve a stale entry and refresh it in the background
+                if now < keep_until:
+                    if key not in _refreshing:
+                        logger.debug("Serving stale %s, refreshing in background", key)
+                        _refreshing.add(key)
+                        task = asyncio.create_task(refresh(key, args, kwargs))
+                        _refresh_tasks.add(task)
+                        task.add_done_callback(_refresh_tasks.discard)
+                    return result
+            
+            # Execute function and cache result, or join an identical call
+            # that is already running
+            async def run():
+                logger.debug("Cache miss for %s, executing function", key)
+                result = await func(*args, **kwargs)
+                store(key, result)
+                return result
+            
+            return await _run_once(key, run)
         return wrapper
     return decorator
 
+# Maximum number of courses fetched at once by fetch_all_courses
+MAX_CONCURRENT_COURSES = 10
+
+def _course_id(course: Any) -> Any:
+    """Get a course's ID whether it's a canvasapi object, a dict or already an ID."""
+    if isinstance(course, dict):
+        return course["id"]
+    return getattr(course, "id", course)
+
+async def fetch_all_courses(fn: Callable, courses: Iterable[Any], concurrency: int = MAX_CONCURRENT_COURSES) -> Dict[Any, Any]:
+    """Run a per-course fetch for many courses concurrently.
+    
+    Args:
+        fn: Called with each course. Coroutine functions are awaited; plain
+            (blocking canvasapi) functions run in a worker thread.
+        courses: Courses as canvasapi objects, dicts or IDs
+        concurrency: Maximum number of courses fetched at once
+        
+    Returns:
+        Results keyed by course ID. A course whose fetch raised maps to the
+        exception, so one failing course doesn't sink the rest.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    is_async = asyncio.iscoroutinefunction(fn)
+    
+    async def fetch_one(course):
+        async with semaphore:
+            try:
+                if is_async:
+                    return _course_id(course), await fn(course)
+                return _course_id(course), await asyncio.to_thread(fn, course)
+            except Exception as e:
+                return _course_id(course), e
+    
+    return dict(await asyncio.gather(*(fetch_one(course) for course in courses)))
+
 async def clear_cache():
     """Clear the API response cache."""
     cache.clear()
-    cache_ttl.clear()
+    clear_response_cache()
+    with disk_cache() as db:
+        if db is not None:
+            try:
+                db.execute("DELETE FROM results")
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error clearing cached results on disk: {e}")
     return {"status": "success", "message": "Cache cleared"}
 
+@single_flight
 async def format_course_summary(course_id: int):
     """Generate a comprehensive summary of a course with assignments, modules, etc."""
     try:
         canvas = get_canvas()
-        course = canvas.get_course(course_id, include=["term", "total_students"])
-        course_data = get_object_data(course)
-        
-        # Get assignments using canvasapi
-        assignments = list(course.get_assignments())
-        assignments_data = [get_object_data(a) for a in assignments]
+        course_ref = get_course_ref(course_id)
         
-        # Get modules using canvasapi
-        modules = list(course.get_modules())
+        # Fetch the course, its assignments and its modules at once; canvasapi
+        # is blocking, so each runs in a worker thread. Assignments use the
+        # same URL as get_course_assignments, so they share its cached response.
+        course, assignments, modules = await asyncio.gather(
+            asyncio.to_thread(canvas.get_course, course_id, include=["term", "total_students"]),
+            asyncio.to_thread(fetch_all_pages, course_ref.get_assignments()),
+            asyncio.to_thread(fetch_all_pages, course_ref.get_modules()),
+        )
+        course_data = get_object_data(course)
         
-        # Format summary
-        now = datetime.now()
+        # Format summary. Only due_at is needed, so read it off the objects
+        # instead of converting every assignment to a dict. Canvas's own UTC
+        # format ("...Z") sorts chronologically, so those are compared as
+        # strings; anything else is parsed and compared as epoch seconds.
+        now = datetime.now(timezone.utc)
+        now_iso = now.strftime('%Y-%m-%dT%H:%M:%SZ')
+        now_ts = now.timestamp()
         upcoming_assignments = 0
         
-        for a in assignments_data:
-            due_at = a.get("due_at")
-            if due_at and due_at:
-                try:
-                    due_date = datetime.fromisoformat(due_at.replace("Z", "+00:00"))
-                    if due_date > now:
-                        upcoming_assignments += 1
-                except (ValueError, TypeError):
-                    pass
+        for a in assignments:
+            due_at = getattr(a, "due_at", None)
+            if not due_at:
+                continue
+            if len(due_at) == len(now_iso) and due_at.endswith("Z"):
+                upcoming_assignments += due_at > now_iso
+                continue
+            try:
+                if datetime.fromisoformat(due_at).timestamp() > now_ts:
+                    upcoming_assignments += 1
+            except (ValueError, TypeError):
+                pass
                 
         # Get course properties safely
         course_name = course_data.get("name", "Unknown Course")
@@ -96,7 +326,7 @@ async def format_course_summary(course_id: int):
             "term": term_name,
             "students": students,
             "assignments": {
-                "total": len(assignments_data),
+                "total": len(assignments),
                 "upcoming": upcoming_assignments
             },
             "modules": len(modules)
@@ -110,6 +340,29 @@ async def format_course_summary(course_id: int):
         logger.error(f"Error formatting course summary: {e}")
         return {"error": str(e), "status": "unknown_error"}
 
+def to_columnar(rows: Any) -> Any:
+    """Turn a list of dicts into one list of values per key.
+    
+    Every key is written once instead of once per row, which shrinks large
+    listings considerably. Error dicts are returned unchanged.
+    
+    Args:
+        rows: List of dicts, as returned by the listing tools
+        
+    Returns:
+        dict: Column name to the list of values, with None where a row lacks the key
+    """
+    if not isinstance(rows, list):
+        return rows
+    columns = dict.fromkeys(key for row in rows for key in row)
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+def _format_named_item(index: int, item: Dict[str, Any]) -> str:
+    """Format a dict item of format_for_claude as a numbered line with its due date."""
+    if item.get('due_at'):
+        return f"{index}. {item['name']} (Due: {item['due_at']})"
+    return f"{index}. {item['name']}"
+
 def format_for_claude(data, type_name, title=None, summary=None, items=None):
     """
     Format data in a Claude-friendly way for better understanding and parsing.
@@ -134,27 +387,24 @@ def format_for_claude(data, type_name, title=None, summary=None, items=None):
     if summary:
         output.append(f"SUMMARY: {summary}")
     
-    # Add items if provided
+    # Add items if provided, numbered by position (other item types are skipped)
     if items:
         output.append("\nITEMS:")
-        for i, item in enumerate(items, 1):
-            if isinstance(item, dict) and 'name' in item:
-                item_line = f"{i}. {item['name']}"
-                if 'due_at' in item and item['due_at']:
-                    item_line += f" (Due: {item['due_at']})"
-                output.append(item_line)
-            elif isinstance(item, str):
-                output.append(f"{i}. {item}")
+        output.extend(
+            f"{i}. {item}" if isinstance(item, str) else _format_named_item(i, item)
+            for i, item in enumerate(items, 1)
+            if isinstance(item, str) or (isinstance(item, dict) and 'name' in item)
+        )
     
     # Add main data in a structured way
     if isinstance(data, dict):
         output.append("\nDETAILS:")
-        # Format dictionary for readability
-        for key, value in data.items():
-            # Skip complex nested structures
-            if isinstance(value, (dict, list)) and key not in ['name', 'title', 'id']:
-                continue
-            output.append(f"- {key}: {value}")
+        # Format dictionary for readability, skipping complex nested structures
+        output.extend(
+            f"- {key}: {value}"
+            for key, value in data.items()
+            if not isinstance(value, (dict, list)) or key in ('name', 'title', 'id')
+        )
     
     output.append(f"</{type_name}>\n")
     